@@ -1,15 +1,82 @@
 import json
+import logging
+import os
+import selectors
+from collections import deque
 import socket
 import threading
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
-from queue import Queue, Empty
 from typing import Dict, List, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_log = logging.getLogger(__name__)
 
 DEFAULT_HOST = "127.0.0.1"
 DEFAULT_PORT = 17894
 MAX_CONTENT_LENGTH = 512 * 1024  # 512 KB payload limit
+POLL_INTERVAL = 0.5  # seconds between stop-flag checks while idle
+# Listening sockets sharing the port via SO_REUSEPORT (the kernel spreads accepts
+# across them); platforms without SO_REUSEPORT always use one
+ACCEPT_WORKERS = min(os.cpu_count() or 2, 4) if hasattr(socket, "SO_REUSEPORT") else 1
+
+
+def _json_dumps(payload: Dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
+
+def _json_loads(raw: bytes):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+# Fixed responses, serialized once
+_OK_JSON = _json_dumps({"ok": True})
+_NOT_READY_JSON = _json_dumps({"ok": False, "error": "Bridge not ready"})
+_UNKNOWN_ENDPOINT_JSON = _json_dumps({"ok": False, "error": "Unknown endpoint"})
+
+
+def _download_request(body: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    url = (body.get("url") or "").strip()
+    filename = (body.get("filename") or "").strip()
+    headers = body.get("headers") or {}
+
+    if not url:
+        return None, "Missing url"
+
+    return {
+        "kind": "download",
+        "url": url,
+        "filename": filename or None,
+        "headers": headers if isinstance(headers, dict) else {},
+    }, None
+
+
+def _media_request(body: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    url = (body.get("manifest_url") or "").strip()
+    media_type = (body.get("media_type") or "hls").strip().lower()
+    source = (body.get("source_url") or "").strip()
+    title = (body.get("title") or "").strip()
+    headers = body.get("headers") or {}
+
+    if not url:
+        return None, "Missing manifest_url"
+
+    return {
+        "kind": "media",
+        "manifest_url": url,
+        "media_type": media_type,
+        "source_url": source or None,
+        "title": title or None,
+        "headers": headers if isinstance(headers, dict) else {},
+    }, None
 
 
 class _BridgeRequestHandler(BaseHTTPRequestHandler):
@@ -26,7 +93,14 @@ class _BridgeRequestHandler(BaseHTTPRequestHandler):
         status: HTTPStatus = HTTPStatus.OK,
         headers: Optional[Dict[str, str]] = None,
     ):
-        response = json.dumps(payload).encode("utf-8")
+        self._send_bytes(_json_dumps(payload), status, headers)
+
+    def _send_bytes(
+        self,
+        response: bytes,
+        status: HTTPStatus = HTTPStatus.OK,
+        headers: Optional[Dict[str, str]] = None,
+    ):
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Access-Control-Allow-Origin", "*")
@@ -46,11 +120,11 @@ class _BridgeRequestHandler(BaseHTTPRequestHandler):
 
         try:
             raw = self.rfile.read(length)
-            data = json.loads(raw.decode("utf-8"))
+            data = _json_loads(raw)
             if not isinstance(data, dict):
                 return None, "JSON body must be an object"
             return data, None
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, UnicodeDecodeError):
             return None, "Invalid JSON"
 
     def do_OPTIONS(self):
@@ -63,76 +137,57 @@ class _BridgeRequestHandler(BaseHTTPRequestHandler):
 
     def do_POST(self):
         if not self.bridge:
-            self._send_json({"ok": False, "error": "Bridge not ready"}, HTTPStatus.SERVICE_UNAVAILABLE)
+            self._send_bytes(_NOT_READY_JSON, HTTPStatus.SERVICE_UNAVAILABLE)
             return
 
-        path = self.path.rstrip("/")
-
-        if path == "/enqueue":
-            body, error = self._parse_json_body()
-            if error:
-                self._send_json({"ok": False, "error": error}, HTTPStatus.BAD_REQUEST)
-                return
+        build_request = self._ROUTES.get(self.path.rstrip("/"))
+        if build_request is None:
+            self._send_bytes(_UNKNOWN_ENDPOINT_JSON, HTTPStatus.NOT_FOUND)
+            return
 
-            url = (body.get("url") or "").strip()
-            filename = (body.get("filename") or "").strip()
-            headers = body.get("headers") or {}
+        body, error = self._parse_json_body()
+        if error:
+            self._send_json({"ok": False, "error": error}, HTTPStatus.BAD_REQUEST)
+            return
 
-            if not url:
-                self._send_json({"ok": False, "error": "Missing url"}, HTTPStatus.BAD_REQUEST)
-                return
+        payload, error = build_request(body)
+        if error:
+            self._send_json({"ok": False, "error": error}, HTTPStatus.BAD_REQUEST)
+            return
 
-            try:
-                self.bridge.enqueue_request(
-                    {
-                        "kind": "download",
-                        "url": url,
-                        "filename": filename or None,
-                        "headers": headers if isinstance(headers, dict) else {},
-                    }
-                )
-            except Exception as exc:  # pragma: no cover - defensive
-                self._send_json({"ok": False, "error": str(exc)}, HTTPStatus.INTERNAL_SERVER_ERROR)
-                return
-
-            self._send_json({"ok": True})
+        try:
+            self.bridge.enqueue_request(payload)
+        except Exception as exc:  # pragma: no cover - defensive
+            self._send_json({"ok": False, "error": str(exc)}, HTTPStatus.INTERNAL_SERVER_ERROR)
             return
 
-        if path == "/enqueue-media":
-            body, error = self._parse_json_body()
-            if error:
-                self._send_json({"ok": False, "error": error}, HTTPStatus.BAD_REQUEST)
-                return
+        self._send_bytes(_OK_JSON)
 
-            url = (body.get("manifest_url") or "").strip()
-            media_type = (body.get("media_type") or "hls").strip().lower()
-            source = (body.get("source_url") or "").strip()
-            title = (body.get("title") or "").strip()
-            headers = body.get("headers") or {}
+    # path -> builder turning the JSON body into a queued request (or an error)
+    _ROUTES = {
+        "/enqueue": _download_request,
+        "/enqueue-media": _media_request,
+    }
 
-            if not url:
-                self._send_json({"ok": False, "error": "Missing manifest_url"}, HTTPStatus.BAD_REQUEST)
-                return
 
-            try:
-                self.bridge.enqueue_request(
-                    {
-                        "kind": "media",
-                        "manifest_url": url,
-                        "media_type": media_type,
-                        "source_url": source or None,
-                        "title": title or None,
-                        "headers": headers if isinstance(headers, dict) else {},
-                    }
-                )
-            except Exception as exc:
-                self._send_json({"ok": False, "error": str(exc)}, HTTPStatus.INTERNAL_SERVER_ERROR)
-                return
-
-            self._send_json({"ok": True})
-            return
+class _BridgeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    share_port = False
+
+    def server_bind(self):
+        if self.share_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
 
-        self._send_json({"ok": False, "error": "Unknown endpoint"}, HTTPStatus.NOT_FOUND)
+    def serve_until(self, stop_event: threading.Event, poll_interval: float = POLL_INTERVAL):
+        # DefaultSelector picks epoll/kqueue where available; only accept when the
+        # listening socket is actually readable instead of blocking in handle_request.
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.fileno(), selectors.EVENT_READ)
+            while not stop_event.is_set():
+                if selector.select(timeout=poll_interval):
+                    self._handle_request_noblock()
+                self.service_actions()
 
 
 class BrowserBridge:
@@ -140,88 +195,111 @@ class BrowserBridge:
     Lightweight HTTP bridge so browser extensions can hand URLs to the app.
     """
 
-    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, verbose: bool = False):
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        verbose: bool = False,
+        accept_workers: int = ACCEPT_WORKERS,
+    ):
         self.host = host
         self.port = port
         self.verbose = verbose
-        self._queue: "Queue[Dict]" = Queue()
-        self._server: Optional[ThreadingHTTPServer] = None
-        self._thread: Optional[threading.Thread] = None
+        if verbose:
+            _log.setLevel(logging.DEBUG)
+        self.accept_workers = max(1, accept_workers) if hasattr(socket, "SO_REUSEPORT") else 1
+        # deque.append/popleft are atomic, so handler threads and the UI poll need no lock
+        self._queue: "deque[Dict]" = deque()
+        self._servers: List[_BridgeHTTPServer] = []
+        self._threads: List[threading.Thread] = []
         self._stop_event = threading.Event()
 
     def start(self):
-        if self._thread and self._thread.is_alive():
+        if any(t.is_alive() for t in self._threads):
             return
 
-        server_address = (self.host, self._find_open_port(self.port))
+        port = self._find_open_port(self.port)
 
         _BridgeRequestHandler.bridge = self
-        self._server = ThreadingHTTPServer(server_address, _BridgeRequestHandler)
-        self._server.daemon_threads = True
-
         self._stop_event.clear()
-        self._thread = threading.Thread(target=self._serve, name="BrowserBridgeServer", daemon=True)
-        self._thread.start()
-
-        if self.verbose:
-            print(f"[BrowserBridge] Listening on http://{server_address[0]}:{server_address[1]}")
-
-    def _serve(self):
+        for index in range(self.accept_workers):
+            try:
+                server = self._create_server(port, share_port=self.accept_workers > 1)
+            except OSError:
+                if not self._servers:
+                    raise
+                break  # keep the listeners we already have
+            thread = threading.Thread(
+                target=self._serve, args=(server,), name=f"BrowserBridgeServer-{index}", daemon=True
+            )
+            self._servers.append(server)
+            self._threads.append(thread)
+            thread.start()
+
+        _log.debug("Listening on http://%s:%s (%d accept thread(s))", self.host, port, len(self._servers))
+
+    def _create_server(self, port: int, share_port: bool) -> _BridgeHTTPServer:
+        server = _BridgeHTTPServer((self.host, port), _BridgeRequestHandler, bind_and_activate=False)
+        server.share_port = share_port
         try:
-            while not self._stop_event.is_set():
-                self._server.handle_request()
-        except Exception as exc:  # pragma: no cover - defensive
-            if self.verbose:
-                print(f"[BrowserBridge] Server stopped: {exc}")
+            server.server_bind()
+            server.server_activate()
+        except OSError:
+            server.server_close()
+            raise
+        return server
+
+    def _serve(self, server: _BridgeHTTPServer):
+        try:
+            server.serve_until(self._stop_event)
+        except Exception:  # pragma: no cover - defensive
+            _log.debug("Server stopped", exc_info=True)
 
     def stop(self):
         self._stop_event.set()
-        if self._server:
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(timeout=POLL_INTERVAL * 2)
+        for server in self._servers:
             try:
-                self._server.server_close()
+                server.server_close()
             except Exception:
                 pass
-        if self._thread and self._thread.is_alive():
-            self._thread.join(timeout=1.0)
-        self._server = None
-        self._thread = None
+        self._servers = []
+        self._threads = []
 
     def enqueue_request(self, payload: Dict):
-        self._queue.put(payload, block=False)
+        self._queue.append(payload)
 
     def poll_requests(self, limit: int = 20) -> List[Dict]:
         items: List[Dict] = []
-        for _ in range(limit):
-            try:
-                items.append(self._queue.get_nowait())
-            except Empty:
-                break
+        try:
+            for _ in range(limit):
+                items.append(self._queue.popleft())
+        except IndexError:
+            pass
         return items
 
     def resolve_server_address(self) -> Optional[Tuple[str, int]]:
-        if not self._server:
+        if not self._servers:
             return None
-        return self._server.server_address
+        return self._servers[0].server_address
 
     def _find_open_port(self, preferred: int) -> int:
-        if self._port_available(preferred):
-            return preferred
-        for offset in range(1, 100):
-            candidate = preferred + offset
-            if self._port_available(candidate):
-                if self.verbose:
-                    print(f"[BrowserBridge] Port {preferred} in use, falling back to {candidate}")
-                return candidate
-        raise RuntimeError("No open port available for BrowserBridge")
-
-    def _port_available(self, port: int) -> bool:
+        # One probe socket for the whole sweep: a failed bind() leaves it unbound,
+        # so it can simply be retried on the next candidate.
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            try:
-                sock.bind((self.host, port))
-            except OSError:
-                return False
-        return True
+            for offset in range(100):
+                candidate = preferred + offset
+                try:
+                    sock.bind((self.host, candidate))
+                except OSError:
+                    continue
+                if offset:
+                    _log.debug("Port %s in use, falling back to %s", preferred, candidate)
+                return candidate
+        raise RuntimeError("No open port available for BrowserBridge")
 
 
 __all__ = ["BrowserBridge", "DEFAULT_HOST", "DEFAULT_PORT"]
@@ -1,16 +1,150 @@
 # downloader.py
 import os
+import errno
+import json
+import logging
+import sys
 import math
+import mmap
+import re
+import shutil
 import threading
 import requests
 import time
 import urllib3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Optional, TypedDict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urlparse, unquote, urljoin
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_log = logging.getLogger(__name__)
+
 # Disable SSL warnings (for self-signed certificates)
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-CHUNK_SIZE = 64 * 1024  # 64KB
+# 1MB per read/write: far fewer Python iterations and syscalls per MB. Costs up to
+# threads * CHUNK_SIZE of buffered data per task, and pause is noticed per chunk.
+CHUNK_SIZE = 1 << 20
+SPEED_INTERVAL = 0.5  # seconds between speed samples / stop checks
+MERGE_BUFFER_SIZE = 4 * 1024 * 1024  # 4MB, last-resort copy buffer
+PROGRESS_FILE = "progress.json"  # per-range progress of a segmented download
+MIN_PART_SIZE = 4 * 1024 * 1024  # below this, connection setup outweighs the extra parallelism
+MAX_THREADS_PER_TASK = 16
+PROGRESS_SAVE_INTERVAL = 5.0  # seconds between progress checkpoints while downloading
+
+# Linux sendfile() accepts a regular file as the output; other platforms need a socket
+_SENDFILE_TO_FILE = sys.platform.startswith("linux") and hasattr(os, "sendfile")
+# copy_file_range (Linux 4.5+) copies inside the kernel and can reflink on
+# Btrfs/XFS; cleared the first time the kernel reports it as unsupported
+_copy_file_range_ok = hasattr(os, "copy_file_range")
+_O_BINARY = getattr(os, "O_BINARY", 0)  # Windows only
+
+# Reconnects per range after a dropped or stalled transfer (resuming at the
+# current offset), with exponential backoff starting at RETRY_BACKOFF seconds;
+# a drop after progress starts the count over
+RANGE_RETRIES = 3
+RETRY_BACKOFF = 0.3
+_TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    urllib3.exceptions.ProtocolError,
+    urllib3.exceptions.ReadTimeoutError,
+)
+
+# Connections per host kept alive in the shared pool: enough for a few
+# 16-thread tasks against the same server
+POOL_MAXSIZE = 64
+
+
+def _build_session():
+    session = requests.Session()
+    # Configure session headers to avoid 403 errors
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': '*/*',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+    })
+    # Disable SSL verification to handle SSL errors (use with caution).
+    # Requests still pass verify=False: with REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE
+    # set, requests lets the environment override the session default.
+    session.verify = False
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# One connection pool for every task, so keep-alive connections (and their TLS
+# handshakes) survive across parts, resumes and tasks on the same host. Tasks
+# must not touch its headers; per-task headers go in DownloadTask.headers.
+_SHARED_SESSION = _build_session()
+
+# KEY=value pairs of an HLS attribute list; quoted values may contain commas
+_ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+# Fixed part of every range request - use simpler headers for download requests;
+# only the Range value differs per part/resume
+_RANGE_HEADERS = {
+    "Accept": "*/*",
+    "Accept-Encoding": "identity",  # Don't compress range requests
+}
+
+
+def _dump_json(path, payload):
+    """Write `payload` to `path` atomically, so a crash never leaves a torn file."""
+    data = orjson.dumps(payload) if orjson is not None else json.dumps(payload).encode("utf-8")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _load_json(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _uri_resolver(base):
+    """
+    urljoin(base, uri) with shortcuts for the two shapes playlist URIs almost
+    always take: absolute http(s) URLs and plain names relative to the base.
+    """
+    parsed = urlparse(base)
+    base_dir = None
+    if parsed.scheme in ("http", "https") and parsed.netloc:
+        base_dir = f"{parsed.scheme}://{parsed.netloc}{parsed.path.rpartition('/')[0]}/"
+
+    def resolve(uri):
+        if uri.startswith(("http://", "https://")):
+            return uri
+        # anything with a scheme, an absolute path, dot segments, a query-only or
+        # fragment-only reference takes the general path
+        if base_dir and uri[0] not in "/.?#" and ":" not in uri and "./" not in uri:
+            return base_dir + uri
+        return urljoin(base, uri)
+
+    return resolve
 
 
 def safe_filename_from_url(url):
@@ -20,39 +154,158 @@ def safe_filename_from_url(url):
     return name
 
 
+def _copy_file(src, out):
+    """Copy the whole of file object `src` to the current position of `out`."""
+    in_fd = src.fileno()
+    size = os.fstat(in_fd).st_size
+    out.flush()
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(in_fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    try:
+        if _copy_file_range_ok and _copy_file_range_all(in_fd, out, size):
+            return
+        if _SENDFILE_TO_FILE and _sendfile_all(in_fd, out.fileno(), size):
+            return
+        if size:
+            try:
+                # one write() straight from the page cache instead of a read/write loop
+                with mmap.mmap(in_fd, 0, access=mmap.ACCESS_READ) as mm:
+                    if hasattr(mmap, "MADV_SEQUENTIAL"):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    out.write(mm)
+                return
+            except (OSError, ValueError):
+                pass
+        shutil.copyfileobj(src, out, MERGE_BUFFER_SIZE)
+    finally:
+        if hasattr(os, "posix_fadvise"):
+            # the source is deleted right after; don't keep it in the page cache
+            os.posix_fadvise(in_fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def _copy_file_range_all(in_fd, out, size):
+    global _copy_file_range_ok
+    out_fd = out.fileno()
+    start = os.lseek(out_fd, 0, os.SEEK_CUR)
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(in_fd, out_fd, size - copied, copied, start + copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError as exc:
+        if copied:
+            raise
+        if exc.errno in (errno.ENOSYS, errno.EOPNOTSUPP):
+            _copy_file_range_ok = False
+        # EXDEV (older kernels across filesystems) etc.: let the caller fall back
+        return False
+    if size and not copied:
+        return False
+    # explicit offsets leave the file position alone
+    out.seek(start + copied)
+    return True
+
+
+def _sendfile_all(in_fd, out_fd, size):
+    offset = 0
+    try:
+        while offset < size:
+            sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+        return True
+    except OSError:
+        # some filesystems refuse sendfile; fall back unless we already wrote
+        if offset:
+            raise
+        return False
+
+
+def _preallocate(fd, size):
+    os.ftruncate(fd, size)
+    if hasattr(os, "posix_fallocate"):
+        try:
+            # reserve the blocks up front so parallel ranges don't fragment the file
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass  # not supported by this filesystem; the sparse file still works
+
+
+def _write_at(fd, data, offset):
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+
+class RangeNotHonouredError(ValueError):
+    """The server answered a partial request with something other than 206."""
+
+
+class TaskRecord(TypedDict, total=False):
+    """Persisted form of a DownloadTask (see to_dict/from_dict)."""
+    url: str
+    dest_folder: str
+    threads: int
+    filename: str
+    total_size: int
+    downloaded: int
+    status: str
+    error: Optional[str]
+    temp_root: str
+    scheduled_start: Optional[str]
+    scheduled_end: Optional[str]
+    repeat_interval: int
+    media_info: Optional[Dict[str, Any]]
+    media_state: Dict[str, int]
+
+
 class DownloadTask:
     """
     Represents a single download job.
     - Run with .start()
-    - Call .pause() to stop (keeps partial parts)
-    - Call .resume() to continue (skips completed parts)
+    - Call .pause() to stop (keeps partial data)
+    - Call .resume() to continue (skips completed ranges)
     """
 
+    # no per-instance __dict__; new attributes must be added here
+    __slots__ = (
+        "url", "threads", "effective_threads", "dest_folder", "filename",
+        "dest_path", "session", "headers", "temp_root", "task_temp",
+        "total_size", "downloaded", "status", "error", "_worker_thread",
+        "_stop_event", "_last_bytes", "_last_time", "speed_bps",
+        "scheduled_start", "scheduled_end", "repeat_interval", "media_info",
+        "media_state",
+    )
+
     def __init__(self, url, dest_folder=".", threads=4, temp_root="data/temp",
                  scheduled_start=None, scheduled_end=None, repeat_interval=0,
-                 media_info=None):
+                 media_info=None, headers=None):
         self.url = url
-        self.threads = max(1, int(threads))
+        self.threads = max(1, int(threads))  # requested maximum
+        # ranges actually used by the current/last segmented run (see _part_count)
+        self.effective_threads = min(self.threads, MAX_THREADS_PER_TASK)
         self.dest_folder = dest_folder
         os.makedirs(dest_folder, exist_ok=True)
         self.filename = safe_filename_from_url(url)
         self.dest_path = os.path.join(dest_folder, self.filename)
-        self.session = requests.Session()
-        
-        # Configure session headers to avoid 403 errors
+        self.session = _SHARED_SESSION
+
+        # sent with every request on top of the shared session's defaults
         parsed_url = urlparse(url)
-        referer = f"{parsed_url.scheme}://{parsed_url.netloc}/"
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': '*/*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Referer': referer,
-        })
-        
-        # Disable SSL verification to handle SSL errors (use with caution)
-        self.session.verify = False
+        # (media headers are persisted in media_info, so restored tasks get them too)
+        self.headers = {'Referer': f"{parsed_url.scheme}://{parsed_url.netloc}/"}
+        self.headers.update((media_info or {}).get("headers") or {})
+        if headers:
+            self.headers.update(headers)
 
         # temp dir for this task
         self.temp_root = temp_root
@@ -61,18 +314,19 @@ class DownloadTask:
 
         # state
         self.total_size = 0
-        self.downloaded = 0  # aggregated across parts
+        # aggregated across parts; only the worker thread (or its monitor loop)
+        # writes it, so reads from the UI need no lock
+        self.downloaded = 0
         self.status = "queued"  # queued, downloading, paused, completed, error
         self.error = None
 
         # threading control
         self._worker_thread = None
         self._stop_event = threading.Event()
-        self._lock = threading.Lock()
 
         # internal: remember last update time/bytes for speed calc
         self._last_bytes = 0
-        self._last_time = time.time()
+        self._last_time = time.monotonic()
         self.speed_bps = 0.0
 
         # scheduling
@@ -90,49 +344,31 @@ class DownloadTask:
     # -------------------------
     def _get_file_info(self, timeout=10):
         """
-        Get file info using GET with Range header instead of HEAD.
-        Some servers block HEAD requests but allow GET with Range.
+        Probe the URL with a single GET for the first byte instead of HEAD.
+        Some servers block HEAD requests but allow GET with Range, and a 206
+        reply carries everything we need (range support + total size).
+        The caller must close the returned (streamed) response.
         """
-        # Try HEAD first, if it fails, use GET with Range: bytes=0-0
-        try:
-            r = self.session.head(self.url, allow_redirects=True, timeout=timeout, verify=False)
-            if r.status_code in (200, 206):
-                return r
-        except Exception:
-            pass
-        
-        # Fallback: Use GET with Range header to get just the first byte
-        # Use simpler headers for this request
-        headers = {
-            'Range': 'bytes=0-0',
-            'Accept': '*/*',
-            'Accept-Encoding': 'identity',
-        }
-        r = self.session.get(self.url, headers=headers, allow_redirects=True, timeout=timeout, verify=False, stream=True)
-        return r
+        headers = {**self.headers, **_RANGE_HEADERS, "Range": "bytes=0-0"}
+        return self.session.get(self.url, headers=headers, timeout=timeout, verify=False, stream=True)
 
     def supports_range_and_size(self):
         try:
-            r = self._get_file_info()
-            r.raise_for_status()
-            
-            # Check Accept-Ranges header
-            accept = r.headers.get("Accept-Ranges", "")
-            supports_range = "bytes" in accept.lower()
-            
-            # Get Content-Length
-            length = r.headers.get("Content-Length")
-            if length and length.isdigit():
-                total_size = int(length)
-            else:
-                # For Range requests, Content-Range header might have the total size
-                content_range = r.headers.get("Content-Range", "")
-                if "/" in content_range:
-                    total_size = int(content_range.split("/")[-1])
-                else:
+            with self._get_file_info() as r:
+                r.raise_for_status()
+
+                if r.status_code == 206:
+                    # Content-Range: bytes 0-0/<total> ("*" if the size is unknown)
+                    _, _, tail = r.headers.get("Content-Range", "").rpartition("/")
+                    return True, int(tail) if tail.isdigit() else None
+
+                # the server ignored the range and started sending the whole file;
+                # closing the response drops the body
+                try:
+                    total_size = int(r.headers.get("Content-Length"))
+                except (TypeError, ValueError):
                     total_size = None
-            
-            return supports_range, total_size
+                return False, total_size
         except Exception as e:
             # If we get 403 or other errors, return False
             return False, None
@@ -140,171 +376,328 @@ class DownloadTask:
     # -------------------------
     # Worker functions
     # -------------------------
-    def _download_range(self, start, end, part_path):
-        # Create headers with Range request - use simpler headers for download requests
-        headers = {
-            "Range": f"bytes={start}-{end}",
-            "Accept": "*/*",
-            "Accept-Encoding": "identity",  # Don't compress range requests
-        }
-        # If a complete part file exists, skip
-        if os.path.exists(part_path):
-            existing = os.path.getsize(part_path)
-            expected = (end - start + 1)
-            if existing == expected:
-                with self._lock:
-                    self.downloaded += existing
-                return
-            # if partial, we'll overwrite in this simple implementation
+    def _download_range(self, rng, path):
+        """
+        Download one [start, end, done] range straight into its slice of `path`.
+        `rng[2]` is only ever written by this worker, so progress needs no lock;
+        the monitor in _run sums the ranges into self.downloaded.
+        A dropped connection is retried from where it stopped, not from `start`;
+        only drops that made no progress count towards RANGE_RETRIES.
+        """
+        fd = os.open(path, os.O_WRONLY | _O_BINARY)
         try:
-            with self.session.get(self.url, headers=headers, stream=True, timeout=30, verify=False, allow_redirects=True) as r:
-                # Accept both 200 (full file) and 206 (partial content) status codes
-                if r.status_code not in (200, 206):
-                    r.raise_for_status()
-                with open(part_path, "wb") as f:
-                    for chunk in r.iter_content(CHUNK_SIZE):
-                        if self._stop_event.is_set():
-                            return
-                        if chunk:
-                            f.write(chunk)
-                            with self._lock:
-                                self.downloaded += len(chunk)
-        except Exception as e:
-            # propagate by setting error flag; upper runner will handle
-            raise
+            attempt = 0
+            while True:
+                done_before = rng[2]
+                try:
+                    self._fetch_range(rng, fd)
+                    return
+                except _TRANSIENT_ERRORS:
+                    if rng[2] != done_before:
+                        attempt = 0  # the link works, it just dropped: start the budget over
+                    elif attempt == RANGE_RETRIES:
+                        raise
+                # back off, but wake up at once if paused
+                if self._stop_event.wait(RETRY_BACKOFF * 2 ** attempt):
+                    return
+                attempt += 1
+        finally:
+            os.close(fd)
+
+    def _fetch_range(self, rng, fd):
+        start, end, done = rng
+        offset = start + done
+        if offset > end:
+            return
+        headers = {**self.headers, **_RANGE_HEADERS, "Range": "bytes=%d-%d" % (offset, end)}
+        with self.session.get(self.url, headers=headers, stream=True, timeout=30, verify=False) as r:
+            r.raise_for_status()
+            # a plain 200 is only usable if we asked for the whole file
+            if r.status_code != 206 and (offset != 0 or end != self.total_size - 1):
+                raise RangeNotHonouredError("Server ignored the range request")
+            # identity-encoded, so read urllib3's stream directly instead of
+            # going through iter_content's per-chunk decode/bookkeeping
+            read = r.raw.read
+            while not self._stop_event.is_set():
+                chunk = read(CHUNK_SIZE, decode_content=False)
+                if not chunk:
+                    raise requests.ConnectionError("Connection closed before the range was complete")
+                chunk = chunk[:end + 1 - offset]
+                _write_at(fd, chunk, offset)
+                offset += len(chunk)
+                rng[2] = offset - start
+                if offset > end:
+                    return
 
-    def _merge_parts(self, parts):
-        # stream-merge parts to final file
-        with open(self.dest_path, "wb") as out:
-            for p in parts:
-                with open(p, "rb") as src:
-                    while True:
-                        chunk = src.read(CHUNK_SIZE)
-                        if not chunk:
-                            break
-                        out.write(chunk)
-        # remove part files
-        for p in parts:
+    def _download_part(self, rng, path, errors):
+        try:
+            self._download_range(rng, path)
+        except Exception as exc:
+            errors.append(exc)
+            # stop sibling parts and wake the monitor in _run
+            self._stop_event.set()
+
+    def _signal_when_done(self, threads, all_done):
+        for t in threads:
+            t.join()
+        all_done.set()
+
+    def _update_speed(self):
+        now = time.monotonic()
+        d = self.downloaded
+        dt = now - self._last_time
+        if dt >= SPEED_INTERVAL:
+            self.speed_bps = (d - self._last_bytes) / dt if dt > 0 else 0.0
+            self._last_time = now
+            self._last_bytes = d
+
+    # -------------------------
+    # In-place segmented output
+    # -------------------------
+    def _partial_path(self):
+        return f"{self.dest_path}.downloading"
+
+    def _progress_path(self):
+        return os.path.join(self.task_temp, PROGRESS_FILE)
+
+    def _part_count(self):
+        """
+        How many ranges to split into: the requested thread count, capped at
+        MAX_THREADS_PER_TASK and so that every part gets at least MIN_PART_SIZE.
+        """
+        if os.path.exists(os.path.join(self.task_temp, "part_0.tmp")):
+            # part files from older versions were laid out for the full count
+            return self.threads
+        return max(1, min(self.threads, MAX_THREADS_PER_TASK, self.total_size // MIN_PART_SIZE))
+
+    def _plan_ranges(self, parts):
+        part_size = math.ceil(self.total_size / parts)
+        ranges = []
+        for i in range(parts):
+            start = i * part_size
+            end = min(start + part_size - 1, self.total_size - 1)
+            if start > end:
+                break
+            ranges.append([start, end, 0])
+        return ranges
+
+    def _load_progress(self):
+        """Saved ranges for the current total size, or None if there is nothing to resume."""
+        if not os.path.exists(self._partial_path()):
+            return None
+        try:
+            data = _load_json(self._progress_path())
+            if data.get("total_size") != self.total_size:
+                return None
+            return [[int(start), int(end), int(done)] for start, end, done in data["ranges"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_progress(self, ranges):
+        os.makedirs(self.task_temp, exist_ok=True)
+        _dump_json(self._progress_path(), {
+            "total_size": self.total_size,
+            "downloaded": sum(done for _, _, done in ranges),
+            "ranges": ranges,
+        })
+
+    def _saved_downloaded(self):
+        """Bytes already on disk according to the progress file (or legacy part files)."""
+        try:
+            data = _load_json(self._progress_path())
+            if "downloaded" in data:
+                return int(data["downloaded"])
+            return sum(int(done) for _, _, done in data["ranges"])
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        try:
+            with os.scandir(self.task_temp) as it:
+                return sum(e.stat().st_size for e in it if e.name.startswith("part_") and e.is_file(follow_symlinks=False))
+        except OSError:
+            return 0
+
+    def _prepare_partial(self, ranges):
+        """Create/size the .downloading file and fold in part files from older versions."""
+        path = self._partial_path()
+        fresh = not os.path.exists(path)
+        with open(path, "wb" if fresh else "r+b") as out:
+            if fresh or os.fstat(out.fileno()).st_size != self.total_size:
+                _preallocate(out.fileno(), self.total_size)
+            self._adopt_legacy_parts(ranges, out)
+
+    def _adopt_legacy_parts(self, ranges, out):
+        # Older versions wrote part_<i>.tmp files and merged them at the end. The
+        # layout is the same as _plan_ranges, so copy each one into its slice.
+        for i, rng in enumerate(ranges):
+            part_path = os.path.join(self.task_temp, f"part_{i}.tmp")
+            if not os.path.exists(part_path):
+                continue
+            start, end, _ = rng
+            out.seek(start)
+            with open(part_path, "rb") as src:
+                _copy_file(src, out)
+            rng[2] = min(os.path.getsize(part_path), end - start + 1)
             try:
-                os.remove(p)
+                os.remove(part_path)
             except Exception:
                 pass
+        out.truncate(self.total_size)
 
-    def _single_stream_download(self, dest_path):
+    def _finish_partial(self):
+        os.replace(self._partial_path(), self.dest_path)
+        self._remove_progress()
+
+    def _remove_progress(self):
         try:
-            with self.session.get(self.url, stream=True, timeout=30, verify=False, allow_redirects=True) as r:
-                r.raise_for_status()
-                with open(dest_path, "ab") as f:
-                    for chunk in r.iter_content(CHUNK_SIZE):
-                        if self._stop_event.is_set():
-                            return
-                        if chunk:
-                            f.write(chunk)
-                            with self._lock:
-                                self.downloaded += len(chunk)
+            os.remove(self._progress_path())
         except Exception:
-            raise
+            pass
+
+    def discard_partial(self):
+        """Delete the temp data and any partially written output of this task."""
+        shutil.rmtree(self.task_temp, ignore_errors=True)
+        try:
+            os.remove(self._partial_path())
+        except OSError:
+            pass
+
+    def _single_stream_download(self, dest_path):
+        with self.session.get(self.url, headers=self.headers, stream=True, timeout=30, verify=False) as r:
+            r.raise_for_status()
+            # no range support: a restart has to rewrite the file from the start
+            with open(dest_path, "wb", buffering=CHUNK_SIZE) as f:
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    if self._stop_event.is_set():
+                        return
+                    if chunk:
+                        f.write(chunk)
+                        self.downloaded += len(chunk)
 
     def _run(self):
         """
         The main worker that runs in a background thread.
         """
-        print(f"[DownloadTask] Starting download: {self.url}")
+        _log.debug("Starting download: %s", self.url)
 
         self.status = "starting"
         self.error = None
         self._stop_event.clear()
 
         try:
-            # Calculate downloaded count from existing part files FIRST (before getting file info)
-            # This preserves progress when resuming
-            self.downloaded = 0
-            if os.path.exists(self.task_temp):
-                for f in os.listdir(self.task_temp):
-                    fp = os.path.join(self.task_temp, f)
-                    if os.path.isfile(fp):
-                        self.downloaded += os.path.getsize(fp)
-            
-            # Media downloads are handled via special pipeline
-            if self.media_info:
-                self._run_media_download()
-                return
+            # loops only to restart once the server stops honouring saved ranges
+            while True:
+                # Restore the downloaded count FIRST (before getting file info)
+                # This preserves progress when resuming
+                self.downloaded = self._saved_downloaded()
+
+                # Media downloads are handled via special pipeline
+                if self.media_info:
+                    self._run_media_download()
+                    return
 
-            # Get file info from server
-            supports_range, total = self.supports_range_and_size()
-            if total is None:
-                total = 0
+                # Resuming a segmented download we have progress for: the server has
+                # already shown it serves ranges for this size, so skip the probe
+                ranges = self._load_progress() if self.total_size > 0 else None
+                probed = ranges is None
+                if probed:
+                    # Get file info from server
+                    supports_range, total = self.supports_range_and_size()
+                    if total is None:
+                        total = 0
             
-            # Preserve existing total_size if we have one (from restore), otherwise use server value
-            if self.total_size > 0 and total > 0:
-                # Use the larger value (in case file was updated)
-                self.total_size = max(self.total_size, total)
-            elif total > 0:
-                self.total_size = total
-            # If total is 0, keep existing total_size if we have one
-
-            if not supports_range or self.total_size == 0:
-                # fallback single-stream (no range)
+                    # Preserve existing total_size if we have one (from restore), otherwise use server value
+                    if self.total_size > 0 and total > 0:
+                        # Use the larger value (in case file was updated)
+                        self.total_size = max(self.total_size, total)
+                    elif total > 0:
+                        self.total_size = total
+                    # If total is 0, keep existing total_size if we have one
+
+                    if not supports_range or self.total_size == 0:
+                        # fallback single-stream (no range)
+                        self.status = "downloading"
+                        self.downloaded = 0
+                        self._single_stream_download(self.dest_path)
+                        if self._stop_event.is_set():
+                            self.status = "paused"
+                            return
+                        self.status = "completed"
+                        return
+
+                    # segmented download, written in place into the .downloading file
+                    ranges = self._load_progress()
+                    if ranges is None:
+                        ranges = self._plan_ranges(self._part_count())
+                self.effective_threads = len(ranges)
+                partial_path = self._partial_path()
+                self._prepare_partial(ranges)
+                self.downloaded = sum(done for _, _, done in ranges)
+
+                # start a thread per unfinished range
+                errors = []
+                threads = [
+                    threading.Thread(target=self._download_part, args=(rng, partial_path, errors), daemon=True)
+                    for rng in ranges
+                    if rng[0] + rng[2] <= rng[1]
+                ]
+
+                # if there are no threads (all ranges already present), just finish
+                if not threads:
+                    self._finish_partial()
+                    self.status = "completed"
+                    return
+
                 self.status = "downloading"
-                self._single_stream_download(self.dest_path)
+                for t in threads:
+                    t.start()
+                all_done = threading.Event()
+                threading.Thread(target=self._signal_when_done, args=(threads, all_done), daemon=True).start()
+
+                # monitor threads: completion wakes us immediately, a pause (or a failed
+                # part, which sets the stop event) within one SPEED_INTERVAL
+                # checkpoint periodically too, so a crash only loses the last few seconds
+                next_save = time.monotonic() + PROGRESS_SAVE_INTERVAL
+                try:
+                    while not all_done.wait(SPEED_INTERVAL):
+                        if self._stop_event.is_set():
+                            break
+                        self.downloaded = sum(done for _, _, done in ranges)
+                        self._update_speed()
+                        if time.monotonic() >= next_save:
+                            self._save_progress(ranges)
+                            next_save = time.monotonic() + PROGRESS_SAVE_INTERVAL
+                finally:
+                    self.downloaded = sum(done for _, _, done in ranges)
+                    self._save_progress(ranges)
+
+                if errors:
+                    if not probed and isinstance(errors[0], RangeNotHonouredError):
+                        # the server stopped serving ranges since the last session:
+                        # drop the partial file and saved layout, start over with a probe.
+                        # The failed part set the stop event; let the other range threads
+                        # notice it and close the file before it is removed.
+                        all_done.wait()
+                        self._remove_progress()
+                        os.remove(partial_path)
+                        self.downloaded = 0
+                        if self.status == "paused":
+                            # paused meanwhile: keep it paused, the next start probes afresh
+                            return
+                        self.status = "starting"
+                        self._stop_event.clear()
+                        continue
+                    raise errors[0]
                 if self._stop_event.is_set():
+                    # leave partial data intact and stop
                     self.status = "paused"
                     return
-                self.status = "completed"
-                return
-
-            # segmented download
-            part_size = math.ceil(self.total_size / self.threads)
-            parts = []
-            threads = []
-
-            # start per-part threads
-            for i in range(self.threads):
-                start = i * part_size
-                end = min(start + part_size - 1, self.total_size - 1)
-                part_path = os.path.join(self.task_temp, f"part_{i}.tmp")
-                parts.append(part_path)
-                # If part already exists and size matches expected, skip thread
-                if os.path.exists(part_path):
-                    existing = os.path.getsize(part_path)
-                    expected = end - start + 1
-                    if existing == expected:
-                        continue
-                t = threading.Thread(target=self._download_range, args=(start, end, part_path), daemon=True)
-                threads.append(t)
 
-            # if there are no threads (all parts already present), just merge
-            if not threads:
-                self._merge_parts(parts)
+                # all ranges finished -> move into place
+                self._finish_partial()
                 self.status = "completed"
+                # set speed to zero
+                self.speed_bps = 0.0
                 return
-
-            self.status = "downloading"
-            for t in threads:
-                t.start()
-
-            # monitor threads
-            while any(t.is_alive() for t in threads):
-                if self._stop_event.is_set():
-                    # leave partial files intact and stop
-                    self.status = "paused"
-                    return
-                time.sleep(0.25)
-                # update speed
-                now = time.time()
-                with self._lock:
-                    d = self.downloaded
-                dt = now - self._last_time
-                if dt >= 0.5:
-                    self.speed_bps = (d - self._last_bytes) / dt if dt > 0 else 0.0
-                    self._last_time = now
-                    self._last_bytes = d
-
-            # all parts finished -> merge
-            self._merge_parts(parts)
-            self.status = "completed"
-            # set speed to zero
-            self.speed_bps = 0.0
         except Exception as exc:
             self.status = "error"
             self.error = str(exc)
@@ -313,16 +706,21 @@ class DownloadTask:
     # Public control API
     # -------------------------
     def start(self):
-        """Start downloading (from queued or paused)."""
-        if self.status == "downloading":
-            return
+        """Start downloading (from queued or paused); False if a worker is already running."""
+        # judged by the worker thread, not status: _run only sets "starting" from
+        # inside the thread, and a restored task may carry a stale "downloading"
+        if self.is_alive():
+            return False
         self._stop_event.clear()
         self._worker_thread = threading.Thread(target=self._run, daemon=True)
         self._worker_thread.start()
+        return True
 
     def pause(self):
         """Pause/stop the current download (partial parts preserved)."""
         if self.status in ("downloading", "starting"):
+            # marked before signalling, so _run can tell a pause from a failed part
+            self.status = "paused"
             self._stop_event.set()
             # wait a short time for threads to respect stop
             if self._worker_thread:
@@ -341,7 +739,7 @@ class DownloadTask:
     # -------------------------
     # Serialization for persistence
     # -------------------------
-    def to_dict(self):
+    def to_dict(self) -> TaskRecord:
         """Convert task to dictionary for saving."""
         return {
             'url': self.url,
@@ -361,7 +759,7 @@ class DownloadTask:
         }
     
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data: TaskRecord):
         """Create task from dictionary."""
         task = cls(
             url=data['url'],
@@ -379,16 +777,31 @@ class DownloadTask:
         task.error = data.get('error')
         task.media_state = data.get('media_state', {'segments_total': 0, 'segments_done': 0})
         
-        # Restore downloaded count from existing part files
-        if os.path.exists(task.task_temp):
-            task.downloaded = 0
-            for f in os.listdir(task.task_temp):
-                fp = os.path.join(task.task_temp, f)
-                if os.path.isfile(fp):
-                    task.downloaded += os.path.getsize(fp)
+        # Restore downloaded count from the progress file / part files on disk
+        # (__init__ has just created task_temp, so no existence check needed)
+        task.downloaded = task._saved_downloaded()
         
         return task
 
+    @classmethod
+    def from_row(cls, row):
+        """Create task from a database row (anything indexable by column name, e.g. sqlite3.Row)."""
+        task = cls(
+            url=row['url'],
+            dest_folder=row['dest_folder'],
+            threads=row['threads'] or 4,
+            temp_root=row['temp_root'] or 'data/temp',
+            scheduled_start=row['scheduled_start'],
+            scheduled_end=row['scheduled_end'],
+            repeat_interval=row['repeat_interval'] or 0,
+        )
+        task.total_size = row['total_size'] or 0
+        task.status = row['status'] or 'paused'
+        task.error = row['error']
+        # the progress file is more current than the throttled database column
+        task.downloaded = task._saved_downloaded()
+        return task
+
     # -------------------------
     # Scheduling helpers
     # -------------------------
@@ -398,7 +811,6 @@ class DownloadTask:
         if isinstance(value, str):
             return value
         try:
-            from datetime import datetime, timezone
             if isinstance(value, datetime):
                 if value.tzinfo is None:
                     value = value.replace(tzinfo=timezone.utc)
@@ -421,7 +833,7 @@ class DownloadTask:
         self._stop_event.clear()
         self.downloaded = 0
         self._last_bytes = 0
-        self._last_time = time.time()
+        self._last_time = time.monotonic()
         self.total_size = 0
         try:
             media_type = (self.media_info or {}).get("media_type", "hls").lower()
@@ -433,68 +845,56 @@ class DownloadTask:
             self.status = "error"
             self.error = str(exc)
 
-    def _fetch_text(self, url, headers=None, timeout=15):
-        hdrs = self.session.headers.copy()
-        if headers:
-            hdrs.update(headers)
-        resp = self.session.get(url, headers=hdrs, timeout=timeout, verify=False, allow_redirects=True)
+    def _fetch_text(self, url, timeout=15):
+        resp = self.session.get(url, headers=self.headers, timeout=timeout, verify=False)
         resp.raise_for_status()
         return resp.text
 
-    def _download_binary(self, url, file_obj, headers=None):
-        hdrs = self.session.headers.copy()
-        if headers:
-            hdrs.update(headers)
-        with self.session.get(url, headers=hdrs, stream=True, timeout=30, verify=False, allow_redirects=True) as resp:
+    def _fetch_segment(self, url):
+        """Body of one media segment, or None if the task was paused meanwhile."""
+        chunks = []
+        with self.session.get(url, headers=self.headers, stream=True, timeout=30, verify=False) as resp:
             resp.raise_for_status()
             for chunk in resp.iter_content(CHUNK_SIZE):
                 if self._stop_event.is_set():
-                    return False
-                if chunk:
-                    file_obj.write(chunk)
-                    with self._lock:
-                        self.downloaded += len(chunk)
-            return True
+                    return None
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _fetch_segment_or_stop(self, url):
+        try:
+            return self._fetch_segment(url)
+        except Exception:
+            # don't let the other workers keep fetching segments we won't write
+            self._stop_event.set()
+            raise
 
     def _parse_hls_playlist(self, text, manifest_url):
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        if not lines or not lines[0].startswith("#EXTM3U"):
+        lines = (line.strip() for line in text.splitlines())
+        if next((line for line in lines if line), "")[:7] != "#EXTM3U":
             raise ValueError("Invalid HLS playlist")
 
         variants = []
         segments = []
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            if line.startswith("#EXT-X-STREAM-INF"):
-                attrs = self._parse_attribute_list(line)
-                bandwidth = int(attrs.get("BANDWIDTH", 0))
-                resolution = attrs.get("RESOLUTION")
-                uri = None
-                j = i + 1
-                while j < len(lines):
-                    if not lines[j].startswith("#"):
-                        uri = lines[j]
-                        break
-                    j += 1
-                if uri:
+        add_segment = segments.append
+        resolve = _uri_resolver(manifest_url)
+        pending_variant = None  # attributes of a #EXT-X-STREAM-INF awaiting its URI
+        for line in lines:
+            if not line:
+                continue
+            if line[0] != "#":
+                if pending_variant is not None:
                     variants.append({
-                        "uri": urljoin(manifest_url, uri),
-                        "bandwidth": bandwidth,
-                        "resolution": resolution,
+                        "uri": resolve(line),
+                        "bandwidth": int(pending_variant.get("BANDWIDTH", 0)),
+                        "resolution": pending_variant.get("RESOLUTION"),
                     })
-                i = j
-            elif line.startswith("#EXTINF"):
-                # Segment duration line, next line should be the segment URL
-                if i + 1 < len(lines) and not lines[i + 1].startswith("#"):
-                    segment_url = lines[i + 1]
-                    segments.append(urljoin(manifest_url, segment_url))
-                    i += 2
-                    continue
-            elif not line.startswith("#"):
-                # Direct segment URL (some playlists don't use #EXTINF)
-                segments.append(urljoin(manifest_url, line))
-            i += 1
+                    pending_variant = None
+                else:
+                    # segment URL, after #EXTINF or bare (some playlists don't use #EXTINF)
+                    add_segment(resolve(line))
+            elif line.startswith("#EXT-X-STREAM-INF"):
+                pending_variant = self._parse_attribute_list(line)
 
         if variants:
             # choose highest bandwidth variant
@@ -506,30 +906,22 @@ class DownloadTask:
         return {"type": "media", "segments": segments}
 
     def _parse_attribute_list(self, line):
-        # line like #EXT-X-STREAM-INF:BANDWIDTH=1234,RESOLUTION=1920x1080
-        attrs = {}
-        if ":" not in line:
-            return attrs
-        parts = line.split(":", 1)[1]
-        for chunk in parts.split(","):
-            if "=" not in chunk:
-                continue
-            key, value = chunk.split("=", 1)
-            value = value.strip().strip('"')
-            attrs[key.strip()] = value
-        return attrs
+        # line like #EXT-X-STREAM-INF:BANDWIDTH=1234,CODECS="avc1.4d401f,mp4a.40.2"
+        _, sep, attributes = line.partition(":")
+        if not sep:
+            return {}
+        return {key: value.strip().strip('"') for key, value in _ATTRIBUTE_RE.findall(attributes)}
 
     def _download_hls_media(self):
-        headers = (self.media_info or {}).get("headers") or {}
         manifest_url = (self.media_info or {}).get("manifest_url") or self.url
 
-        manifest_text = self._fetch_text(manifest_url, headers=headers)
+        manifest_text = self._fetch_text(manifest_url)
         parsed = self._parse_hls_playlist(manifest_text, manifest_url)
 
         if parsed["type"] == "master":
             target_variant = parsed["variants"][0]
             manifest_url = target_variant["uri"]
-            manifest_text = self._fetch_text(manifest_url, headers=headers)
+            manifest_text = self._fetch_text(manifest_url)
             parsed = self._parse_hls_playlist(manifest_text, manifest_url)
 
         segments = parsed.get("segments", [])
@@ -539,33 +931,44 @@ class DownloadTask:
         if not segments:
             raise ValueError("No media segments found")
 
-        temp_path = f"{self.dest_path}.downloading"
+        temp_path = self._partial_path()
         # ensure folder
         os.makedirs(os.path.dirname(self.dest_path), exist_ok=True)
 
         self.status = "downloading"
-        with open(temp_path, "wb") as out:
-            for idx, segment_url in enumerate(segments, start=1):
-                if self._stop_event.is_set():
-                    self.status = "paused"
-                    return
-
-                success = self._download_binary(segment_url, out, headers=headers)
-                if not success:
-                    self.status = "paused"
-                    return
-
-                self.media_state["segments_done"] = idx
-
-                # update speed
-                now = time.time()
-                with self._lock:
-                    d = self.downloaded
-                dt = now - self._last_time
-                if dt >= 0.5:
-                    self.speed_bps = (d - self._last_bytes) / dt if dt > 0 else 0.0
-                    self._last_time = now
-                    self._last_bytes = d
+        # Fetch up to effective_threads segments at once but write them strictly
+        # in playlist order; at most twice that many finished/in-flight segments
+        # are held in memory. Only this thread touches self.downloaded.
+        workers = self.effective_threads
+        window = workers * 2
+        with open(temp_path, "wb") as out, \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hls") as pool:
+            pending = deque()
+            next_segment = iter(segments)
+            try:
+                for segment_url in islice(next_segment, window):
+                    pending.append(pool.submit(self._fetch_segment_or_stop, segment_url))
+
+                idx = 0
+                while pending:
+                    data = pending.popleft().result()
+                    if data is None or self._stop_event.is_set():
+                        # a failed later segment also sets the stop event: report it
+                        for future in pending:
+                            if not future.cancel() and future.exception() is not None:
+                                raise future.exception()
+                        self.status = "paused"
+                        return
+                    out.write(data)
+                    self.downloaded += len(data)
+                    idx += 1
+                    self.media_state["segments_done"] = idx
+                    self._update_speed()
+                    for segment_url in islice(next_segment, 1):
+                        pending.append(pool.submit(self._fetch_segment_or_stop, segment_url))
+            finally:
+                for future in pending:
+                    future.cancel()
 
         os.replace(temp_path, self.dest_path)
         self.status = "completed"
@@ -1,27 +1,277 @@
 # main.py
 import sys
 import os
+import functools
+import json
+import logging
+import operator
+import queue
 import sqlite3
 import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QProgressBar, QFileDialog,
-    QTableWidget, QTableWidgetItem, QWidget as QW, QHeaderView, QMessageBox, QTextEdit,
-    QDialog, QFormLayout, QDateTimeEdit, QCheckBox, QComboBox, QDialogButtonBox
+    QLabel, QLineEdit, QPushButton, QFileDialog,
+    QTableView, QHeaderView, QMessageBox, QTextEdit,
+    QDialog, QFormLayout, QDateTimeEdit, QCheckBox, QComboBox, QDialogButtonBox,
+    QProgressDialog, QStyledItemDelegate, QStyle, QStyleOptionProgressBar, QStyleOptionButton
 )
-from PyQt6.QtCore import QTimer, Qt, QDateTime
+from PyQt6.QtCore import QTimer, Qt, QDateTime, QAbstractTableModel, QModelIndex, QEvent
 from datetime import datetime, timedelta, timezone
 from downloader import DownloadTask, safe_filename_from_url
 from browser_bridge import BrowserBridge
 
+_log = logging.getLogger(__name__)
+
 DEFAULT_THREADS_PER_TASK = 4
 DB_FILE = "data/downloads.db"
+SETTINGS_FILE = "data/settings.json"
+DATA_DIR = os.path.dirname(DB_FILE)  # holds the database and settings
+LOG_MAX_LINES = 500  # lines kept in the log box
+REFRESH_INTERVAL_MS = 300  # table refresh while something is transferring
+IDLE_REFRESH_INTERVAL_MS = 1000  # otherwise just schedules and bridge requests
+PERSIST_INTERVAL = 1.0  # seconds between progress-only database writes
+WRITER_CLOSE_WAIT = 2.0  # seconds to wait for the final flush before showing "Saving..."
+# PRAGMA user_version once the one-off JSON migration has been handled
+SCHEMA_VERSION = 1
+# (threshold, divisor, unit) for the speed column, largest first
+SPEED_UNITS = ((1024**2, float(1024**2), "MB/s"), (1024, 1024.0, "KB/s"))
+IDLE_SPEED_TEXT = "0 B/s"
+# WAL turns each commit into an append instead of a full journal rewrite + fsync;
+# NORMAL sync is still crash-safe in WAL mode (only the last commits may be lost)
+DB_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA busy_timeout=5000;
+    PRAGMA cache_size=-8000;
+    PRAGMA mmap_size=268435456;
+    PRAGMA wal_autocheckpoint=1000;
+"""
+DELETE_TASK_SQL = "DELETE FROM downloads WHERE url = ? AND dest_folder = ?"
+UPSERT_TASK_SQL = """
+    INSERT INTO downloads
+        (url, dest_folder, filename, threads, total_size, downloaded, status, error, temp_root,
+         scheduled_start, scheduled_end, repeat_interval)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(url, dest_folder) DO UPDATE SET
+        filename = excluded.filename, threads = excluded.threads,
+        total_size = excluded.total_size, downloaded = excluded.downloaded,
+        status = excluded.status, error = excluded.error, temp_root = excluded.temp_root,
+        scheduled_start = excluded.scheduled_start, scheduled_end = excluded.scheduled_end,
+        repeat_interval = excluded.repeat_interval, updated_at = CURRENT_TIMESTAMP
+"""
+# served by ix_downloads_unfinished_created (see init_database)
+LOAD_TASKS_SQL = """
+    SELECT url, dest_folder, filename, threads, total_size, downloaded,
+           status, error, temp_root, scheduled_start, scheduled_end, repeat_interval
+    FROM downloads
+    WHERE status != 'completed'
+    ORDER BY created_at DESC
+"""
 REPEAT_CHOICES = [
     ("No repeat", 0),
     ("Hourly", 3600),
     ("Daily", 86400),
     ("Weekly", 604800),
 ]
+REPEAT_LABEL_BY_SECONDS = {seconds: label for label, seconds in REPEAT_CHOICES}
+REPEAT_INDEX_BY_SECONDS = {seconds: i for i, (_, seconds) in enumerate(REPEAT_CHOICES)}
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_iso_utc(value):
+    """
+    Parse a stored ISO timestamp into an aware UTC datetime (None if invalid).
+    Schedules are checked every tick, so the same few strings are memoized.
+    """
+    try:
+        text = value
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        dt = datetime.fromisoformat(text)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _schedule_text(start, end, repeat):
+    """
+    Human readable schedule for the stored (start, end, repeat) triple.
+    The status tooltip asks for it on every hover, so results are memoized.
+    """
+    parts = []
+    for verb, value in (("Starts", start), ("Stops", end)):
+        dt = _parse_iso_utc(value) if value else None
+        if dt:
+            parts.append(f"{verb} {dt.astimezone().strftime('%Y-%m-%d %H:%M')}")
+    if repeat > 0:
+        label = REPEAT_LABEL_BY_SECONDS.get(repeat)
+        if label:
+            parts.append(f"Repeats {label.lower()}")
+        else:
+            parts.append(f"Repeats every {timedelta(seconds=repeat)}")
+    return ", ".join(parts)
+
+
+class DownloadTableModel(QAbstractTableModel):
+    """
+    Read-only view of the window's task list. Cells are computed from the
+    tasks when painted, so a refresh is a single dataChanged signal.
+    """
+
+    HEADERS = ["#", "File", "Progress", "Status", "Speed", "Actions"]
+    PROGRESS_COLUMN = 2
+    SPEED_COLUMN = 4
+    ACTIONS_COLUMN = 5
+    _CENTERED = (0, 3, 4)
+    _LIVE_ROLES = [Qt.ItemDataRole.DisplayRole]
+
+    def __init__(self, tasks, format_speed, status_tooltip, parent=None):
+        super().__init__(parent)
+        self.tasks = tasks  # shared with the window, only changed through this model
+        self._format_speed = format_speed
+        self._status_tooltip = status_tooltip
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tasks)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        row, column = index.row(), index.column()
+        if not index.isValid() or row >= len(self.tasks):
+            return None
+        task = self.tasks[row]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return str(row + 1)
+            if column == 1:
+                return task.filename
+            if column == self.PROGRESS_COLUMN:
+                return self.progress_percent(task)
+            if column == 3:
+                return task.status
+            if column == self.SPEED_COLUMN:
+                if task.status == "completed":
+                    return IDLE_SPEED_TEXT
+                return self._format_speed(task.speed_bps)
+        elif role == Qt.ItemDataRole.TextAlignmentRole and column in self._CENTERED:
+            return Qt.AlignmentFlag.AlignCenter
+        elif role == Qt.ItemDataRole.ToolTipRole and column == 3:
+            return self._status_tooltip(task) or None
+        return None
+
+    @staticmethod
+    def progress_percent(task):
+        total = task.total_size
+        # integer math only; same floor as int(downloaded / total * 100)
+        if total and total > 0:
+            return task.downloaded * 100 // total
+        # crude approximation if unknown size
+        return min((task.downloaded * 100) >> 20, 100)
+
+    def append_task(self, task):
+        row = len(self.tasks)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.tasks.append(task)
+        self.endInsertRows()
+
+    def remove_task_at(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        task = self.tasks.pop(row)
+        self.endRemoveRows()
+        return task
+
+    def remove_tasks_at(self, rows):
+        """Remove the given rows, one beginRemoveRows per contiguous run; returns the tasks."""
+        removed = []
+        rows = sorted(rows, reverse=True)
+        # walk bottom-up so earlier indices stay valid
+        i = 0
+        while i < len(rows):
+            last = first = rows[i]
+            i += 1
+            while i < len(rows) and rows[i] == first - 1:
+                first = rows[i]
+                i += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            removed[:0] = self.tasks[first:last + 1]
+            del self.tasks[first:last + 1]
+            self.endRemoveRows()
+        return removed
+
+    def refresh(self, first_row, last_row):
+        """Repaint the live columns (progress..speed) of rows first_row..last_row."""
+        # only the display text/percent moves between ticks
+        self.dataChanged.emit(
+            self.index(first_row, self.PROGRESS_COLUMN),
+            self.index(last_row, self.SPEED_COLUMN),
+            self._LIVE_ROLES,
+        )
+
+
+class ProgressBarDelegate(QStyledItemDelegate):
+    """Paints the progress column as a progress bar, without a widget per row."""
+
+    def paint(self, painter, option, index):
+        percent = index.data() or 0
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Horizontal
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = percent
+        bar.text = f"{percent}%"
+        bar.textVisible = True
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ProgressBar, bar, painter)
+
+
+class ActionButtonsDelegate(QStyledItemDelegate):
+    """
+    Paints the row's action buttons and dispatches clicks to handler(row).
+    The row is taken from the clicked index, so it is always current.
+    """
+
+    def __init__(self, actions, parent=None):
+        super().__init__(parent)
+        self._actions = actions  # [(label, handler), ...]
+
+    def _button_rects(self, rect):
+        width = rect.width() // len(self._actions)
+        return [rect.adjusted(i * width, 1, (i + 1) * width - rect.width(), -1)
+                for i in range(len(self._actions))]
+
+    def paint(self, painter, option, index):
+        style = option.widget.style() if option.widget else QApplication.style()
+        for (label, _), rect in zip(self._actions, self._button_rects(option.rect)):
+            button = QStyleOptionButton()
+            button.rect = rect
+            button.text = label
+            button.state = QStyle.StateFlag.State_Enabled | QStyle.StateFlag.State_Raised
+            style.drawControl(QStyle.ControlElement.CE_PushButton, button, painter)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.Type.MouseButtonRelease or event.button() != Qt.MouseButton.LeftButton:
+            return False
+        pos = event.position().toPoint()
+        for (_, handler), rect in zip(self._actions, self._button_rects(option.rect)):
+            if rect.contains(pos):
+                handler(index.row())
+                return True
+        return False
 
 
 class ScheduleDialog(QDialog):
@@ -76,8 +326,7 @@ class ScheduleDialog(QDialog):
                 self.end_edit.setEnabled(False)
 
             repeat_seconds = int(task.repeat_interval or 0)
-            index = next((i for i, (_, s) in enumerate(REPEAT_CHOICES) if s == repeat_seconds), 0)
-            self.repeat_combo.setCurrentIndex(index)
+            self.repeat_combo.setCurrentIndex(REPEAT_INDEX_BY_SECONDS.get(repeat_seconds, 0))
             if not self.start_checkbox.isChecked():
                 self.repeat_combo.setEnabled(False)
         else:
@@ -216,8 +465,22 @@ class IDMWindow(QWidget):
         super().__init__()
         self.setWindowTitle("PyIDM - Multi Download Manager")
         self.resize(950, 500)
-        self.tasks = []  # list of DownloadTask objects
+        self.tasks = []  # list of DownloadTask objects, changed through self.model
+        self._shown_state = {}  # task -> (status, downloaded, speed_bps) last shown
+        # unfinished tasks per URL / manifest, for the bridge's duplicate checks
+        self._active_urls = Counter()
+        self._active_manifests = Counter()
+        self._counted_tasks = set()
         self.bridge = None
+        self._conn = None  # shared SQLite connection, see get_db_connection
+        self._db_lock = threading.Lock()
+        # database writes are queued as (sql, params) and applied by a writer thread
+        self._write_q = queue.Queue()
+        self._db_writer = threading.Thread(target=self._db_writer_loop, name="DBWriter", daemon=True)
+        self._db_writer.start()
+        # last UPSERT_TASK_SQL row queued per task, so unchanged tasks are skipped
+        self._persist_snapshot = {}
+        self._last_persist_ts = 0.0
 
         # --- top controls ---
         top_layout = QHBoxLayout()
@@ -230,6 +493,10 @@ class IDMWindow(QWidget):
         self.settings_btn = QPushButton("Settings")
         self.settings_btn.clicked.connect(self.open_settings)
         # Settings
+        # save_settings numbers each save; _write_settings only lets a newer one land
+        self._settings_lock = threading.Lock()
+        self._settings_seq = 0
+        self._settings_written = 0
         self.settings = self.load_settings()
         self.default_folder = self.settings.get("default_folder", os.getcwd())
         self.folder_label = QLabel(self.default_folder)
@@ -241,8 +508,18 @@ class IDMWindow(QWidget):
         top_layout.addWidget(self.folder_label)
 
         # --- table ---
-        self.table = QTableWidget(0, 6)
-        self.table.setHorizontalHeaderLabels(["#", "File", "Progress", "Status", "Speed", "Actions"])
+        self.model = DownloadTableModel(self.tasks, self._format_speed, self._status_tooltip, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setItemDelegateForColumn(
+            DownloadTableModel.PROGRESS_COLUMN, ProgressBarDelegate(self.table))
+        self.table.setItemDelegateForColumn(DownloadTableModel.ACTIONS_COLUMN, ActionButtonsDelegate([
+            ("Start", self.start_task),
+            ("Pause", self.pause_task),
+            ("Resume", self.resume_task),
+            ("Remove", self.remove_task),
+            ("Schedule", self.schedule_task),
+        ], self.table))
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         self.table.setColumnWidth(0, 40)
         self.table.setColumnWidth(2, 200)
@@ -256,6 +533,9 @@ class IDMWindow(QWidget):
         self.log_box = QTextEdit()
         self.log_box.setReadOnly(True)
         self.log_box.setMaximumHeight(120)
+        # the document drops its oldest lines instead of growing all session
+        self.log_box.document().setMaximumBlockCount(LOG_MAX_LINES)
+        self._log_buf = deque(maxlen=LOG_MAX_LINES)  # flushed by refresh_table
 
         # --- bottom controls ---
         bottom_layout = QHBoxLayout()
@@ -279,9 +559,11 @@ class IDMWindow(QWidget):
         layout.addLayout(bottom_layout)
         self.setLayout(layout)
 
-        # timer to refresh UI
+        # timer to refresh UI; it only slows down (never stops) while the window
+        # is hidden, since schedules, bridge requests and persistence run on it too
+        self._view_hidden = False
         self.timer = QTimer()
-        self.timer.setInterval(300)
+        self.timer.setInterval(REFRESH_INTERVAL_MS)
         self.timer.timeout.connect(self.refresh_table)
         self.timer.start()
         
@@ -327,7 +609,6 @@ class IDMWindow(QWidget):
 
     def load_settings(self):
         """Load settings from file or return defaults."""
-        settings_file = "data/settings.json"
         defaults = {
             "default_folder": os.getcwd(),
             "threads": DEFAULT_THREADS_PER_TASK,
@@ -338,25 +619,40 @@ class IDMWindow(QWidget):
             "media_auto": True,
         }
         
-        if os.path.exists(settings_file):
-            try:
-                import json
-                with open(settings_file, 'r') as f:
-                    loaded = json.load(f)
-                    defaults.update(loaded)
-            except Exception as e:
-                print(f"Error loading settings: {e}")
+        # just try the open; a missing file (first run) is not an error
+        try:
+            with open(SETTINGS_FILE, 'r') as f:
+                loaded = json.load(f)
+                defaults.update(loaded)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading settings: {e}")
         
         return defaults
 
     def save_settings(self):
-        """Save settings to file."""
-        settings_file = "data/settings.json"
+        """Save settings to file (in the background; the newest settings win)."""
+        # serialize here so the writer never sees a dict the UI is changing
+        data = json.dumps(self.settings, indent=2)
+        self._settings_seq += 1
+        threading.Thread(
+            target=self._write_settings, args=(data, self._settings_seq), name="SettingsWriter"
+        ).start()
+
+    def _write_settings(self, data, seq):
         try:
-            os.makedirs(os.path.dirname(settings_file), exist_ok=True)
-            import json
-            with open(settings_file, 'w') as f:
-                json.dump(self.settings, f, indent=2)
+            os.makedirs(DATA_DIR, exist_ok=True)
+            tmp_path = f"{SETTINGS_FILE}.{seq}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            with self._settings_lock:
+                # an older save finishing late must not replace a newer file
+                if seq > self._settings_written:
+                    os.replace(tmp_path, SETTINGS_FILE)
+                    self._settings_written = seq
+                else:
+                    os.remove(tmp_path)
         except Exception as e:
             print(f"Error saving settings: {e}")
 
@@ -376,7 +672,6 @@ class IDMWindow(QWidget):
             dest_folder=folder,
             threads=threads
         )
-        self.tasks.append(task)
         self._add_table_row(task)
         self.log(f"[Added] {task.filename}")
         self.save_task(task)  # Save after adding
@@ -386,133 +681,118 @@ class IDMWindow(QWidget):
             task.start()
 
     def _add_table_row(self, task):
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-
-        # id
-        id_item = QTableWidgetItem(str(row + 1))
-        id_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.table.setItem(row, 0, id_item)
-
-        # file name
-        self.table.setItem(row, 1, QTableWidgetItem(task.filename))
-
-        # progress bar
-        progress_bar = QProgressBar()
-        progress_bar.setMaximum(100)
-        # Set initial progress if task has progress
-        if task.total_size and task.total_size > 0:
-            percent = int((task.downloaded / task.total_size) * 100)
-            progress_bar.setValue(percent)
+        """Append task to self.tasks and show it in the table."""
+        self.model.append_task(task)
+        self._wake_refresh()  # it may be auto-started right after
+        self._shown_state[task] = self._row_state(task)
+        self._track_active(task, task.status != "completed")
+
+    def _track_active(self, task, active):
+        """Count task towards _active_urls/_active_manifests while it is unfinished."""
+        if active == (task in self._counted_tasks):
+            return
+        if active:
+            self._counted_tasks.add(task)
         else:
-            progress_bar.setValue(0)
-        self.table.setCellWidget(row, 2, progress_bar)
-
-        # status
-        status_item = QTableWidgetItem(task.status)
-        status_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.table.setItem(row, 3, status_item)
-
-        # speed
-        speed_item = QTableWidgetItem("0 B/s")
-        speed_item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.table.setItem(row, 4, speed_item)
-
-        # actions
-        action_widget = QW()
-        act_layout = QHBoxLayout()
-        start_btn = QPushButton("Start")
-        pause_btn = QPushButton("Pause")
-        resume_btn = QPushButton("Resume")
-        remove_btn = QPushButton("Remove")
-        schedule_btn = QPushButton("Schedule")
-
-        start_btn.clicked.connect(lambda _, r=row: self.start_task(r))
-        pause_btn.clicked.connect(lambda _, r=row: self.pause_task(r))
-        resume_btn.clicked.connect(lambda _, r=row: self.resume_task(r))
-        remove_btn.clicked.connect(lambda _, r=row: self.remove_task(r))
-        schedule_btn.clicked.connect(lambda _, r=row: self.schedule_task(r))
-
-        act_layout.addWidget(start_btn)
-        act_layout.addWidget(pause_btn)
-        act_layout.addWidget(resume_btn)
-        act_layout.addWidget(remove_btn)
-        act_layout.addWidget(schedule_btn)
-        act_layout.setContentsMargins(0, 0, 0, 0)
-        action_widget.setLayout(act_layout)
-        self.table.setCellWidget(row, 5, action_widget)
+            self._counted_tasks.discard(task)
+        keys = [(self._active_urls, task.url)]
+        manifest_url = (task.media_info or {}).get("manifest_url")
+        if manifest_url:
+            keys.append((self._active_manifests, manifest_url))
+        for counter, key in keys:
+            counter[key] += 1 if active else -1
+            if counter[key] <= 0:
+                del counter[key]
+
+    def _wake_refresh(self):
+        """Go back to the fast refresh rate right away (a task was started)."""
+        if self._view_hidden:
+            return
+        if self.timer.interval() != REFRESH_INTERVAL_MS:
+            self.timer.start(REFRESH_INTERVAL_MS)
 
     def refresh_table(self):
-        try:
-            self._consume_bridge_requests()
-        except Exception as exc:
-            self.log(f"[Bridge Error] {exc}")
-
-        needs_save = False
+        # the table refreshes every tick, but plain progress is only persisted
+        # once per PERSIST_INTERVAL (and only for tasks that moved)
+        now = time.monotonic()
+        persist_due = now - self._last_persist_ts >= PERSIST_INTERVAL
+        # one wall-clock reading per tick, so every schedule is judged against the same moment
+        utc_now = self._now_utc()
         tasks_to_save = []
-        for idx, task in enumerate(list(self.tasks)):
-            if idx >= self.table.rowCount():
-                continue
-            progress_widget = self.table.cellWidget(idx, 2)
-            status_item = self.table.item(idx, 3)
-            speed_item = self.table.item(idx, 4)
-
-            schedule_changed, schedule_needs_save = self._enforce_schedule(task)
-
-            total = task.total_size
-            downloaded = task.downloaded
-
-            if total and total > 0:
-                percent = int((downloaded / total) * 100)
-                progress_widget.setMaximum(100)
-                progress_widget.setValue(percent)
-            else:
-                progress_widget.setMaximum(100)
-                # crude approximation if unknown size
-                progress_widget.setValue(min(downloaded * 100 // 1024 // 1024, 100))
-
-            old_status = status_item.text()
-            status_item.setText(task.status)
-            speed_item.setText(self._format_speed(task.speed_bps))
-            tooltip_parts = []
-            schedule_description = self._schedule_description(task)
-            if schedule_description:
-                tooltip_parts.append(schedule_description)
-            media_description = self._media_description(task)
-            if media_description:
-                tooltip_parts.append(media_description)
-            status_item.setToolTip("\n".join(tooltip_parts))
+        finished = []
+        first_dirty = last_dirty = None  # span of rows that need repainting
+        active = False
+        for row, task in enumerate(self.tasks):
+            schedule_changed, schedule_needs_save = self._enforce_schedule(task, utc_now)
+
+            if task.status in ("starting", "downloading"):
+                active = True
+            shown = self._shown_state.get(task)
+            state = self._row_state(task)
+            status_changed = shown is None or shown[0] != task.status
+            if status_changed:
+                self._track_active(task, task.status != "completed")
+            if state != shown or schedule_changed or schedule_needs_save:
+                self._shown_state[task] = state
+                if first_dirty is None:
+                    first_dirty = row
+                last_dirty = row
             
-            # Save if status changed or task is incomplete
-            if old_status != task.status or task.status != "completed" or schedule_needs_save or schedule_changed:
-                needs_save = True
-                if task.status != "completed":
-                    if task not in tasks_to_save:
-                        tasks_to_save.append(task)
-                elif schedule_needs_save:
-                    if task not in tasks_to_save:
-                        tasks_to_save.append(task)
-            elif schedule_needs_save:
-                needs_save = True
-                if task not in tasks_to_save:
+            # Status changes and schedule edits are written right away, progress
+            # on the throttle; completed tasks are only kept for schedule edits
+            if task.status == "completed" and not schedule_needs_save:
+                if status_changed:
+                    # just finished: drop the row now rather than at shutdown
+                    finished.append((task.url, task.dest_folder))
+                    self._persist_snapshot.pop(task, None)
+            else:
+                if (schedule_needs_save or schedule_changed or status_changed
+                        or (persist_due and self._persist_snapshot.get(task) != self._task_row(task))):
                     tasks_to_save.append(task)
 
             # log errors automatically
             if task.status == "error" and task.error:
                 self.log(f"[ERROR] {task.filename}: {task.error}")
+        # one signal for the changed rows (if any); idle rows cost nothing to repaint
+        if first_dirty is not None and not self._view_hidden:
+            self.model.refresh(first_dirty, last_dirty)
+        # tick slowly while nothing is transferring or nobody is looking
+        interval = REFRESH_INTERVAL_MS if active and not self._view_hidden else IDLE_REFRESH_INTERVAL_MS
+        if self.timer.interval() != interval:
+            self.timer.setInterval(interval)
         
         # Save tasks that need updating (more efficient than saving all)
-        if needs_save:
-            for task in tasks_to_save:
-                self.save_task(task)
+        if finished:
+            self._write_q.put((DELETE_TASK_SQL, finished))
+        if tasks_to_save:
+            self.save_tasks_batch(tasks_to_save)
+        if persist_due:
+            self._last_persist_ts = now
+            if len(self._persist_snapshot) > len(self.tasks):
+                # forget removed tasks
+                live = set(self.tasks)
+                self._persist_snapshot = {t: v for t, v in self._persist_snapshot.items() if t in live}
+
+        # Bridge requests go last: the loop above has just untracked tasks that
+        # finished since the previous tick, so the duplicate checks see the live
+        # status, and their DELETEs are queued ahead of any re-added download
+        try:
+            self._consume_bridge_requests()
+        except Exception as exc:
+            self.log(f"[Bridge Error] {exc}")
+
+        self._flush_log()
+
+    @staticmethod
+    def _row_state(task):
+        return task.status, task.downloaded, task.speed_bps
 
     def _format_speed(self, bps):
-        if bps is None or bps <= 0:
-            return "0 B/s"
-        if bps > 1024**2:
-            return f"{bps / (1024**2):.2f} MB/s"
-        if bps > 1024:
-            return f"{bps / 1024:.2f} KB/s"
+        if not bps or bps <= 0:
+            return IDLE_SPEED_TEXT
+        for threshold, divisor, unit in SPEED_UNITS:
+            if bps > threshold:
+                return f"{bps / divisor:.2f} {unit}"
         return f"{bps:.0f} B/s"
 
     def _now_utc(self):
@@ -521,44 +801,19 @@ class IDMWindow(QWidget):
     def _parse_iso_datetime(self, value):
         if not value:
             return None
-        try:
-            text = value
-            if text.endswith("Z"):
-                text = text[:-1] + "+00:00"
-            dt = datetime.fromisoformat(text)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc)
-        except Exception:
-            return None
-
-    def _format_local_datetime(self, dt):
-        if not dt:
-            return ""
-        local_dt = dt.astimezone()
-        return local_dt.strftime("%Y-%m-%d %H:%M")
+        return _parse_iso_utc(value)
 
     def _qdatetime_from_utc(self, dt):
         if not dt:
             return QDateTime.currentDateTime()
         return QDateTime.fromSecsSinceEpoch(int(dt.timestamp()))
 
+    def _status_tooltip(self, task):
+        parts = [self._schedule_description(task), self._media_description(task)]
+        return "\n".join(part for part in parts if part)
+
     def _schedule_description(self, task):
-        start_dt = self._parse_iso_datetime(task.scheduled_start)
-        end_dt = self._parse_iso_datetime(task.scheduled_end)
-        parts = []
-        if start_dt:
-            parts.append(f"Starts {self._format_local_datetime(start_dt)}")
-        if end_dt:
-            parts.append(f"Stops {self._format_local_datetime(end_dt)}")
-        repeat = int(task.repeat_interval or 0)
-        if repeat > 0:
-            label = next((label for label, seconds in REPEAT_CHOICES if seconds == repeat), None)
-            if label:
-                parts.append(f"Repeats {label.lower()}")
-            else:
-                parts.append(f"Repeats every {timedelta(seconds=repeat)}")
-        return ", ".join(parts)
+        return _schedule_text(task.scheduled_start, task.scheduled_end, int(task.repeat_interval or 0))
 
     def _media_description(self, task):
         if not getattr(task, "media_info", None):
@@ -576,37 +831,46 @@ class IDMWindow(QWidget):
         if repeat <= 0:
             return start_dt, end_dt, False
 
-        updated = False
-        while start_dt and end_dt and end_dt <= now:
-            start_dt += timedelta(seconds=repeat)
-            end_dt += timedelta(seconds=repeat)
-            updated = True
-        while start_dt and not end_dt and start_dt + timedelta(seconds=repeat) <= now:
-            start_dt += timedelta(seconds=repeat)
-            updated = True
-        while not start_dt and end_dt and end_dt <= now:
-            end_dt += timedelta(seconds=repeat)
-            updated = True
+        # skip every missed period in one step (e.g. after a week switched off)
+        step = timedelta(seconds=repeat)
+        periods = 0
+        if end_dt and end_dt <= now:
+            # until the window ends in the future
+            periods = (now - end_dt) // step + 1
+            end_dt += periods * step
+            if start_dt:
+                start_dt += periods * step
+        elif start_dt and not end_dt and start_dt + step <= now:
+            # to the latest start that is not in the future
+            periods = (now - start_dt) // step
+            start_dt += periods * step
+        updated = periods > 0
 
         if updated:
             task.update_schedule(start_dt, end_dt, repeat)
         return start_dt, end_dt, updated
 
-    def _enforce_schedule(self, task):
+    def _enforce_schedule(self, task, now=None):
+        if not (task.scheduled_start or task.scheduled_end or task.repeat_interval):
+            # unscheduled (most tasks): only a stale "scheduled" status to undo
+            if task.status == "scheduled":
+                task.status = "queued"
+                return True, False
+            return False, False
         start_dt = self._parse_iso_datetime(task.scheduled_start)
         end_dt = self._parse_iso_datetime(task.scheduled_end)
         repeat = int(task.repeat_interval or 0)
-        now = self._now_utc()
+        if now is None:
+            now = self._now_utc()
 
         schedule_changed = False
         schedule_updated = False
 
         if repeat > 0:
+            # the advanced datetimes come straight back, no need to re-parse the task
             start_dt, end_dt, advanced = self._advance_schedule(task, start_dt, end_dt, repeat, now)
             if advanced:
                 schedule_updated = True
-                start_dt = self._parse_iso_datetime(task.scheduled_start)
-                end_dt = self._parse_iso_datetime(task.scheduled_end)
 
         if not start_dt and not end_dt:
             if task.status == "scheduled":
@@ -641,12 +905,7 @@ class IDMWindow(QWidget):
                 self.log(f"[Scheduled stop] {task.filename}")
                 schedule_changed = True
             if repeat > 0:
-                next_start = None
-                current_start = self._parse_iso_datetime(task.scheduled_start)
-                if current_start:
-                    next_start = current_start + timedelta(seconds=repeat)
-                elif start_dt:
-                    next_start = start_dt + timedelta(seconds=repeat)
+                next_start = start_dt + timedelta(seconds=repeat) if start_dt else None
                 next_end = end_dt + timedelta(seconds=repeat)
                 task.update_schedule(next_start, next_end, repeat)
                 schedule_updated = True
@@ -670,11 +929,9 @@ class IDMWindow(QWidget):
         except IndexError:
             return
 
-        if task.status in ("downloading",):
-            return
-
-        self.log(f"[Start] {task.filename}")
-        task.start()
+        if task.start():
+            self.log(f"[Start] {task.filename}")
+            self._wake_refresh()
 
     def pause_task(self, row):
         try:
@@ -691,6 +948,7 @@ class IDMWindow(QWidget):
             return
         task.resume()
         self.log(f"[Resumed] {task.filename}")
+        self._wake_refresh()
 
     def _init_bridge(self):
         if self.bridge:
@@ -712,21 +970,28 @@ class IDMWindow(QWidget):
         if not self.bridge:
             return
         payloads = self.bridge.poll_requests()
+        new_tasks = []
         for payload in payloads:
             kind = payload.get("kind", "download")
             if kind == "media":
-                self._handle_media_request(payload)
+                task = self._handle_media_request(payload)
             else:
-                self._handle_download_request(payload)
+                task = self._handle_download_request(payload)
+            if task is not None:
+                new_tasks.append(task)
+        # one executemany for everything this poll added
+        if new_tasks:
+            self.save_tasks_batch(new_tasks)
 
     def _handle_download_request(self, payload):
+        """Add a task for a bridge download request; the caller saves it."""
         url = payload.get("url")
         if not url:
             return
         filename_hint = payload.get("filename")
         headers = payload.get("headers") or {}
         # skip if duplicate URL already queued
-        if any(t.url == url and t.status != "completed" for t in self.tasks):
+        if url in self._active_urls:
             self.log(f"[Bridge] Skipped duplicate URL: {url}")
             return
         threads = self.settings.get("threads", DEFAULT_THREADS_PER_TASK)
@@ -734,20 +999,19 @@ class IDMWindow(QWidget):
             url,
             dest_folder=self.default_folder,
             threads=threads,
+            headers=headers,
         )
         if filename_hint:
             task.filename = filename_hint
             task.dest_path = os.path.join(task.dest_folder, task.filename)
-        if headers:
-            task.session.headers.update(headers)
-        self.tasks.append(task)
         self._add_table_row(task)
         self.log(f"[Bridge] Added {task.filename}")
-        self.save_task(task)
         if self.settings.get("auto_start", True):
             task.start()
+        return task
 
     def _handle_media_request(self, payload):
+        """Add a task for a captured media stream; the caller saves it."""
         # Check if media auto-capture is enabled
         if not self.settings.get("media_auto", True):
             return
@@ -757,7 +1021,7 @@ class IDMWindow(QWidget):
             return
 
         # avoid duplicate manifests
-        if any((t.media_info or {}).get("manifest_url") == manifest_url and t.status != "completed" for t in self.tasks):
+        if manifest_url in self._active_manifests:
             self.log(f"[Media] Skipped duplicate manifest: {manifest_url}")
             return
 
@@ -771,7 +1035,7 @@ class IDMWindow(QWidget):
         task = DownloadTask(
             manifest_url,
             dest_folder=self.default_folder,
-            threads=1,
+            threads=self.settings.get("threads", DEFAULT_THREADS_PER_TASK),
             media_info={
                 "media_type": media_type,
                 "manifest_url": manifest_url,
@@ -781,14 +1045,11 @@ class IDMWindow(QWidget):
         )
         task.filename = filename
         task.dest_path = os.path.join(task.dest_folder, task.filename)
-        if headers:
-            task.session.headers.update(headers)
-        self.tasks.append(task)
         self._add_table_row(task)
         self.log(f"[Media] Captured stream {task.filename}")
-        self.save_task(task)
         if self.settings.get("auto_start", True):
             task.start()
+        return task
 
     def schedule_task(self, row):
         try:
@@ -818,7 +1079,14 @@ class IDMWindow(QWidget):
             else:
                 self.log(f"[Schedule cleared] {task.filename}")
 
-            self.refresh_table()
+            self._update_table_row(row, task)
+
+    def _update_table_row(self, row, task):
+        """Apply task's new schedule right away and repaint only its row."""
+        self._enforce_schedule(task)
+        # _shown_state is left alone so the next tick still persists the change
+        self.model.refresh(row, row)
+        self._wake_refresh()
 
     def remove_task(self, row):
         try:
@@ -827,77 +1095,87 @@ class IDMWindow(QWidget):
             return
         if task.is_alive():
             task.pause()
-        try:
-            import shutil
-            shutil.rmtree(task.task_temp, ignore_errors=True)
-        except Exception:
-            pass
+        task.discard_partial()
         self.delete_task(task.url, task.dest_folder)  # Remove from database
-        self.table.removeRow(row)
-        self.tasks.pop(row)
-        # update IDs
-        for i in range(self.table.rowCount()):
-            self.table.item(i, 0).setText(str(i + 1))
+        self.model.remove_task_at(row)
+        self._shown_state.pop(task, None)
+        self._track_active(task, False)
         self.log(f"[Removed] {task.filename}")
 
     # ------------------ Batch actions ------------------
     def start_all(self):
         for t in self.tasks:
-            if t.status not in ("downloading", "completed"):
+            if t.status != "completed" and t.start():
                 self.log(f"[Start All] {t.filename}")
-                t.start()
+        self._wake_refresh()
 
     def pause_all(self):
         for t in self.tasks:
-            if t.status == "downloading":
+            if t.status in ("starting", "downloading"):
                 t.pause()
                 self.log(f"[Paused All] {t.filename}")
 
     def clear_completed(self):
-        i = 0
-        while i < len(self.tasks):
-            if self.tasks[i].status == "completed":
-                self.table.removeRow(i)
-                self.tasks.pop(i)
-            else:
-                i += 1
-        for r in range(self.table.rowCount()):
-            self.table.item(r, 0).setText(str(r + 1))
+        rows = [i for i, task in enumerate(self.tasks) if task.status == "completed"]
+        if rows:
+            # repaint once after all runs are gone
+            self.table.setUpdatesEnabled(False)
+            try:
+                removed = self.model.remove_tasks_at(rows)
+            finally:
+                self.table.setUpdatesEnabled(True)
+            for task in removed:
+                self._shown_state.pop(task, None)
+                self._track_active(task, False)
+            # the cleared tasks are no longer in self.tasks, so save_tasks won't see them
+            self._write_q.put((DELETE_TASK_SQL, [(t.url, t.dest_folder) for t in removed]))
         self.save_tasks()  # Save after clearing
 
     # ------------------ Logging ------------------
     def log(self, msg):
-        self.log_box.append(msg)
-        print(msg)
+        self._log_buf.append(msg)
+        _log.info(msg)
+
+    def _flush_log(self):
+        if not self._log_buf:
+            return
+        lines = "\n".join(self._log_buf)
+        self._log_buf.clear()
+        self.log_box.setUpdatesEnabled(False)
+        self.log_box.append(lines)
+        self.log_box.setUpdatesEnabled(True)
     
     # ------------------ Persistence ------------------
     def init_database(self):
         """Initialize SQLite database and create table if it doesn't exist."""
         try:
-            os.makedirs(os.path.dirname(DB_FILE), exist_ok=True)
-            conn = sqlite3.connect(DB_FILE)
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS downloads (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    url TEXT NOT NULL,
-                    dest_folder TEXT NOT NULL,
-                    filename TEXT NOT NULL,
-                    threads INTEGER DEFAULT 4,
-                    total_size INTEGER DEFAULT 0,
-                    downloaded INTEGER DEFAULT 0,
-                    status TEXT DEFAULT 'queued',
-                    error TEXT,
-                    temp_root TEXT DEFAULT 'data/temp',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(url, dest_folder)
-                )
-            ''')
-            conn.commit()
-            self._ensure_schedule_columns(cursor)
-            conn.commit()
-            conn.close()
+            # table, index and column upgrades land together or not at all
+            with self._transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS downloads (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        url TEXT NOT NULL,
+                        dest_folder TEXT NOT NULL,
+                        filename TEXT NOT NULL,
+                        threads INTEGER DEFAULT 4,
+                        total_size INTEGER DEFAULT 0,
+                        downloaded INTEGER DEFAULT 0,
+                        status TEXT DEFAULT 'queued',
+                        error TEXT,
+                        temp_root TEXT DEFAULT 'data/temp',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        UNIQUE(url, dest_folder)
+                    )
+                ''')
+                # partial index matching load_tasks' WHERE clause: unfinished rows come
+                # straight out in created_at order, no table scan + temp sort
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS ix_downloads_unfinished_created
+                    ON downloads(created_at) WHERE status != 'completed'
+                ''')
+                self._ensure_schedule_columns(cursor)
             
             # Migrate from JSON if it exists
             self.migrate_from_json()
@@ -918,190 +1196,216 @@ class IDMWindow(QWidget):
             print(f"Error ensuring schedule columns: {e}")
 
     def migrate_from_json(self):
-        """Migrate data from JSON file to SQLite if JSON exists and DB is empty."""
+        """Migrate data from JSON file to SQLite if JSON exists and DB is empty (once)."""
         try:
-            json_file = "data/downloads.json"
-            if not os.path.exists(json_file):
-                return
-            
-            # Check if database already has data
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM downloads')
-            count = cursor.fetchone()[0]
-            conn.close()
-            
-            if count > 0:
-                # Database already has data, skip migration
-                return
+            with self._db_lock:
+                conn = self.get_db_connection()
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                    return
+                json_file = "data/downloads.json"
+                # Check if database already has data
+                if not os.path.exists(json_file) or conn.execute('SELECT COUNT(*) FROM downloads').fetchone()[0] > 0:
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                    return
             
             # Read JSON and migrate
-            import json
             with open(json_file, 'r') as f:
                 tasks_data = json.load(f)
             
-            migrated = 0
+            task_rows = []
             for task_data in tasks_data:
                 try:
                     # Only migrate incomplete tasks
                     if task_data.get('status') != 'completed':
-                        task = DownloadTask.from_dict(task_data)
-                        self.save_task(task)
-                        migrated += 1
+                        task_rows.append(self._task_row(DownloadTask.from_dict(task_data)))
                 except Exception as e:
                     print(f"Error migrating task: {e}")
             
+            # written directly rather than through the writer thread, so load_tasks
+            # (which runs next) sees the rows; the version bump commits with them
+            with self._transaction() as conn:
+                conn.executemany(UPSERT_TASK_SQL, task_rows)
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            os.replace(json_file, json_file + ".migrated")
+            migrated = len(task_rows)
             if migrated > 0:
                 print(f"Migrated {migrated} tasks from JSON to SQLite")
-                # Optionally backup or remove JSON file
-                # os.rename(json_file, json_file + ".backup")
         except Exception as e:
             print(f"Error migrating from JSON: {e}")
     
     def get_db_connection(self):
-        """Get database connection."""
-        return sqlite3.connect(DB_FILE)
+        """Get the shared database connection, opening it on first use."""
+        if self._conn is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            # autocommit; callers hold self._db_lock since bridge/worker callbacks
+            # may reach the database from other threads
+            conn = sqlite3.connect(DB_FILE, check_same_thread=False, isolation_level=None)
+            conn.executescript(DB_PRAGMAS)
+            conn.row_factory = sqlite3.Row  # load_tasks reads columns by name
+            self._conn = conn
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Hold the DB lock and run the block in one write transaction, committed
+        on exit or rolled back if it raises (the connection itself autocommits).
+        """
+        with self._db_lock:
+            conn = self.get_db_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close_database(self):
+        with self._db_lock:
+            if self._conn is not None:
+                try:
+                    # refresh planner statistics where SQLite thinks they are stale
+                    self._conn.execute("PRAGMA optimize")
+                    # fold the WAL back into the database so the -wal file doesn't
+                    # linger at its high-water size between sessions
+                    self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                except sqlite3.Error:
+                    pass
+                self._conn.close()
+                self._conn = None
     
     def save_task(self, task):
-        """Save or update a single task in database."""
-        try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            
-            # Check if task exists
-            cursor.execute('SELECT id FROM downloads WHERE url = ? AND dest_folder = ?', 
-                         (task.url, task.dest_folder))
-            existing = cursor.fetchone()
-            
-            task_dict = task.to_dict()
-            scheduled_start = task_dict.get('scheduled_start')
-            scheduled_end = task_dict.get('scheduled_end')
-            repeat_interval = task_dict.get('repeat_interval', 0)
+        """Queue an upsert of a single task (written by the DB writer thread)."""
+        row = self._persist_snapshot[task] = self._task_row(task)
+        self._write_q.put((UPSERT_TASK_SQL, row))
+
+    def save_tasks_batch(self, tasks):
+        """Queue upserts for several tasks; the writer commits them together."""
+        rows = []
+        for task in tasks:
+            row = self._persist_snapshot[task] = self._task_row(task)
+            rows.append(row)
+        self._write_q.put((UPSERT_TASK_SQL, rows))
+
+    # UPSERT_TASK_SQL parameters read straight off the task in one call
+    _task_row = staticmethod(operator.attrgetter(
+        'url',
+        'dest_folder',
+        'filename',
+        'threads',
+        'total_size',
+        'downloaded',
+        'status',
+        'error',
+        'temp_root',
+        'scheduled_start',
+        'scheduled_end',
+        'repeat_interval',
+    ))
 
-            if existing:
-                # Update existing task
-                cursor.execute('''
-                    UPDATE downloads 
-                    SET filename = ?, threads = ?, total_size = ?, downloaded = ?, 
-                        status = ?, error = ?, temp_root = ?, scheduled_start = ?, 
-                        scheduled_end = ?, repeat_interval = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE url = ? AND dest_folder = ?
-                ''', (
-                    task_dict['filename'],
-                    task_dict['threads'],
-                    task_dict['total_size'],
-                    task_dict['downloaded'],
-                    task_dict['status'],
-                    task_dict['error'],
-                    task_dict['temp_root'],
-                    scheduled_start,
-                    scheduled_end,
-                    repeat_interval,
-                    task.url,
-                    task.dest_folder
-                ))
-            else:
-                # Insert new task
-                cursor.execute('''
-                    INSERT INTO downloads 
-                    (url, dest_folder, filename, threads, total_size, downloaded, status, error, temp_root,
-                     scheduled_start, scheduled_end, repeat_interval)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    task_dict['url'],
-                    task_dict['dest_folder'],
-                    task_dict['filename'],
-                    task_dict['threads'],
-                    task_dict['total_size'],
-                    task_dict['downloaded'],
-                    task_dict['status'],
-                    task_dict['error'],
-                    task_dict['temp_root'],
-                    scheduled_start,
-                    scheduled_end,
-                    repeat_interval
-                ))
-            
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"Error saving task: {e}")
-    
     def delete_task(self, url, dest_folder):
-        """Delete a task from database."""
-        try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('DELETE FROM downloads WHERE url = ? AND dest_folder = ?', 
-                         (url, dest_folder))
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"Error deleting task: {e}")
+        """Queue deletion of a task (ordered after any pending upserts for it)."""
+        self._write_q.put((DELETE_TASK_SQL, (url, dest_folder)))
+
+    def _db_writer_loop(self):
+        """
+        Apply queued writes off the GUI thread, so a slow fsync never stalls
+        the UI. Everything queued since the last wake-up goes into one
+        transaction, in order; None stops the thread. A list of parameter
+        tuples is applied with executemany.
+        """
+        while True:
+            writes = [self._write_q.get()]
+            while True:
+                try:
+                    writes.append(self._write_q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in writes
+            if stop:
+                writes = writes[:writes.index(None)]
+            if writes:
+                try:
+                    with self._transaction() as conn:
+                        for sql, params in writes:
+                            if isinstance(params, list):
+                                conn.executemany(sql, params)
+                            else:
+                                conn.execute(sql, params)
+                except Exception as e:
+                    print(f"Error saving tasks: {e}")
+            if stop:
+                return
+
+    def _stop_db_writer(self):
+        """Flush pending writes and stop the writer thread."""
+        self._write_q.put(None)
+        self._db_writer.join(WRITER_CLOSE_WAIT)
+        if not self._db_writer.is_alive():
+            return
+        # slow disk: keep the event loop spinning behind a busy dialog so the
+        # window doesn't look hung while the rest is written
+        dialog = QProgressDialog("Saving downloads...", None, 0, 0, self)
+        dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        dialog.setMinimumDuration(0)
+        dialog.show()
+        while self._db_writer.is_alive():
+            QApplication.processEvents()
+            self._db_writer.join(0.05)
+        dialog.close()
     
     def save_tasks(self):
-        """Save all incomplete tasks to database."""
+        """Save incomplete tasks that changed since they were last queued."""
         try:
+            to_upsert = []
+            to_delete = []
             for task in self.tasks:
-                # Only save incomplete tasks
-                if task.status not in ("completed",):
-                    self.save_task(task)
-                else:
-                    # Remove completed tasks from database
-                    self.delete_task(task.url, task.dest_folder)
+                # Only save incomplete tasks; completed ones are removed
+                if task.status != "completed":
+                    row = self._task_row(task)
+                    if self._persist_snapshot.get(task) != row:
+                        self._persist_snapshot[task] = row
+                        to_upsert.append(row)
+                elif self._persist_snapshot.pop(task, None) is not None:
+                    # (no snapshot: refresh_table already deleted it when it finished)
+                    to_delete.append((task.url, task.dest_folder))
+            # two executemany calls, committed by the writer in one transaction
+            if to_delete:
+                self._write_q.put((DELETE_TASK_SQL, to_delete))
+            if to_upsert:
+                self._write_q.put((UPSERT_TASK_SQL, to_upsert))
         except Exception as e:
             print(f"Error saving tasks: {e}")
     
     def load_tasks(self):
         """Load incomplete tasks from database."""
         try:
-            conn = self.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT url, dest_folder, filename, threads, total_size, downloaded, 
-                       status, error, temp_root, scheduled_start, scheduled_end, repeat_interval
-                FROM downloads
-                WHERE status != 'completed'
-                ORDER BY created_at DESC
-            ''')
-            rows = cursor.fetchall()
-            conn.close()
+            with self._db_lock:
+                rows = self.get_db_connection().execute(LOAD_TASKS_SQL).fetchall()
             
             loaded_count = 0
+            # dest_folder -> {filename: size}, one scandir per folder that only
+            # stats the files being restored
+            wanted = {}
+            for row in rows:
+                wanted.setdefault(row["dest_folder"], set()).add(row["filename"])
+            folder_sizes = {folder: self._file_sizes(folder, names) for folder, names in wanted.items()}
             for row in rows:
                 try:
-                    (url, dest_folder, filename, threads, total_size, downloaded,
-                     status, error, temp_root, scheduled_start, scheduled_end, repeat_interval) = row
-                    
-                    # Check if temp directory still exists (partial files)
-                    temp_dir = os.path.join(temp_root or 'data/temp', f"{filename}.parts")
+                    dest_folder = row["dest_folder"]
+                    total_size = row["total_size"] or 0
                     
-                    # Only restore if temp directory exists (has partial files) or file doesn't exist
-                    dest_path = os.path.join(dest_folder, filename)
-                    # Check if file is already complete
-                    file_complete = False
-                    if os.path.exists(dest_path):
-                        file_size = os.path.getsize(dest_path)
-                        if total_size > 0 and file_size >= total_size:
-                            file_complete = True
+                    # Ranged downloads write into "<name>.downloading" and only take
+                    # the final name once complete, so a full-size file at dest_path
+                    # means there is nothing left to resume
+                    file_size = folder_sizes[dest_folder].get(row["filename"], -1)
+                    file_complete = total_size > 0 and file_size >= total_size
                     
-                    if not file_complete and (os.path.exists(temp_dir) or not os.path.exists(dest_path)):
-                        task_data = {
-                            'url': url,
-                            'dest_folder': dest_folder,
-                            'filename': filename,
-                            'threads': threads,
-                            'total_size': total_size,
-                            'downloaded': downloaded,
-                            'status': status,
-                            'error': error,
-                            'temp_root': temp_root or 'data/temp',
-                            'scheduled_start': scheduled_start,
-                            'scheduled_end': scheduled_end,
-                            'repeat_interval': repeat_interval or 0
-                        }
-                        task = DownloadTask.from_dict(task_data)
-                        self.tasks.append(task)
+                    if not file_complete:
+                        task = DownloadTask.from_row(row)
+                        # LOAD_TASKS_SQL selects the columns in _task_row order
+                        self._persist_snapshot[task] = tuple(row)
                         self._add_table_row(task)
                         loaded_count += 1
                         # Log with progress percentage
@@ -1111,16 +1415,54 @@ class IDMWindow(QWidget):
                         else:
                             self.log(f"[Restored] {task.filename} ({task.status})")
                 except Exception as e:
-                    print(f"Error loading task {row[2] if len(row) > 2 else 'unknown'}: {e}")
+                    print(f"Error loading task {row['filename']}: {e}")
             
             if loaded_count > 0:
                 self.log(f"[Loaded] {loaded_count} incomplete download(s)")
         except Exception as e:
             print(f"Error loading tasks: {e}")
     
+    def _file_sizes(self, folder, names):
+        """Sizes of the regular files named in names directly inside folder (empty if it is missing)."""
+        try:
+            with os.scandir(folder) as it:
+                # is_file() comes from the directory listing; stat only the wanted ones
+                return {e.name: e.stat().st_size for e in it if e.name in names and e.is_file()}
+        except OSError:
+            return {}
+
+    def _set_view_hidden(self, hidden):
+        if hidden == self._view_hidden:
+            return
+        self._view_hidden = hidden
+        if hidden:
+            self.timer.setInterval(IDLE_REFRESH_INTERVAL_MS)
+        else:
+            if self.tasks:
+                # rows that changed while hidden were not repainted
+                self.model.refresh(0, len(self.tasks) - 1)
+            if self.timer.isActive():
+                self.timer.start(REFRESH_INTERVAL_MS)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.WindowStateChange:
+            self._set_view_hidden(self.isMinimized() or not self.isVisible())
+        super().changeEvent(event)
+
+    def showEvent(self, event):
+        self._set_view_hidden(self.isMinimized())
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._set_view_hidden(True)
+        super().hideEvent(event)
+
     def closeEvent(self, event):
         """Called when window is closed."""
+        self.timer.stop()
         self.save_tasks()
+        self._stop_db_writer()
+        self.close_database()
         if self.bridge:
             try:
                 self.bridge.stop()
@@ -1130,6 +1472,7 @@ class IDMWindow(QWidget):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     app = QApplication(sys.argv)
     w = IDMWindow()
     w.show()